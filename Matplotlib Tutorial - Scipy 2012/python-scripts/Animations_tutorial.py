@@ -93,6 +93,30 @@ timer.add_callback(updatingLine(line))
 ax.figure.canvas.mpl_connect('close_event', lambda *a: timer.stop())
 timer.start()
 
+# <markdowncell>
+
+# Each of these callbacks redraws the entire figure on every tick, even though only the line (or the title) changed. AutoBlitTimer (in timers.py) takes a callback that only modifies artists, works out which ones changed and redraws just those, using blitting behind the scenes.
+
+# <codecell>
+
+from timers import AutoBlitTimer
+fig = plt.figure()
+ax = fig.add_subplot(1, 1, 1)
+x = np.linspace(0, 20)
+y = 0.5 * x * x
+line, = ax.plot(x, y)
+
+# No call to draw() needed, just change the line and title
+def updateLineAndTime(line, x, y):
+    i = updateLineAndTime.i
+    line.set_data(x[:i], y[:i])
+    line.axes.set_title(datetime.now())
+    updateLineAndTime.i = (i + 1) % x.size
+updateLineAndTime.i = 0
+
+timer = AutoBlitTimer(fig, updateLineAndTime, interval=100, args=(line, x, y))
+timer.start()
+
 # <headingcell level=2>
 
 # Exercise:
@@ -125,6 +149,37 @@ line1,line2 = plt.plot(t, x1, t, x2)
 
 # In addition to animation uses, the timer events can serve other useful purposes since they provide a way to trigger updates within the Figure's event loop. For instance, a timer could be used to check for a file and update the plot with any new data.
 
+# <codecell>
+
+# filetail.py has a version of this that only reads what has been added to
+# the file since the last check. Here we watch a CSV log with a header line,
+# keeping every 10th row so that even a huge file stays quick to draw.
+from filetail import CSVTail, LiveTailPlot
+fig = plt.figure()
+ax = fig.add_subplot(1, 1, 1)
+line, = ax.plot([], [])
+
+# Pretend to be an instrument: start the log with a header and some
+# readings, then add 10 more readings every 100 ms
+def writeReadings(n):
+    with open('instrument.csv', 'a') as f:
+        for i in range(writeReadings.i, writeReadings.i + n):
+            f.write('%d,%f\n' % (i, np.sin(i / 100.)))
+    writeReadings.i += n
+with open('instrument.csv', 'w') as f:
+    f.write('sample,reading\n')
+writeReadings.i = 0
+writeReadings(1000)
+writer = fig.canvas.new_timer(interval=100)
+writer.add_callback(writeReadings, 10)
+writer.interval = 100 # Work around bug in QT timer
+
+tail = LiveTailPlot(line, CSVTail('instrument.csv', skiprows=1),
+    interval=500, decimate=10)
+fig.canvas.mpl_connect('close_event', lambda *a: writer.stop())
+writer.start()
+tail.start()
+
 # <markdowncell>
 
 # * Animation classes make use of Timer to simplify the process of creating animations
@@ -190,6 +245,23 @@ anim = ArtistAnimation(fig, ims, interval=500, repeat=False)
 
 # <markdowncell>
 
+# When all of the frames are just new data for the same image, it is cheaper to create a single image and reset its data each frame. ImageSequenceAnimation (in image_animation.py) does this, reading each frame only when it is drawn, so the frames can come from an array, a memory-mapped file or a generator and memory use does not grow with the number of frames.
+
+# <codecell>
+
+from image_animation import ImageSequenceAnimation
+fig = plt.figure()
+ax = fig.add_subplot(1, 1, 1)
+
+# A generator function is called again each time the animation repeats
+def random_images():
+    for i in range(10):
+        yield np.random.randn(20, 20)
+
+anim = ImageSequenceAnimation(fig, random_images, ax=ax, interval=500)
+
+# <markdowncell>
+
 # The reason for using a sequence of collections is to allows composing frames of multiple artists. For instance, we can take the random images a step further and move a green dot in a circular pattern around the center. (Pretend this is the output of some feature identification algorithm running on the image data.)
 
 # <codecell>
@@ -224,6 +296,21 @@ def update_line(frame, line, t, x):
 
 anim = FuncAnimation(fig, update_line, fargs=(line, t, x), interval=50)
 
+# <markdowncell>
+
+# Each call to set_data() here hands the line a new, longer prefix of the data, which it then has to process all over again. When all we want is to reveal an existing line a little at a time, RevealLine (in reveal.py) takes all of the data once and only moves a cursor. With blitting, RevealAnimation draws just the new piece of the line each frame.
+
+# <codecell>
+
+from reveal import RevealLine, RevealAnimation
+fig = plt.figure()
+ax = fig.add_subplot(1, 1, 1)
+line = RevealLine(t, x)
+ax.add_line(line)
+ax.autoscale_view()
+
+anim = RevealAnimation(fig, [line], interval=50, blit=True)
+
 # <headingcell level=2>
 
 # Exercise:
@@ -286,15 +373,15 @@ def make_data():
         yield x
 
 # Function for generating new random data procedurally
-# We store the data in a list since it's good for appending.
-# However, you do end up copying a lot of data to arrays eventually.
-x = []
-y = []
-def update_line(newData, l, x, y):
-    newX, newY = newData
-    x.append(newX)
-    y.append(newY)
-    l.set_data(x, y)
+# Storing the data in lists is good for appending, but you end up copying
+# all of it to arrays on every frame. Instead, we keep the points in a
+# preallocated buffer and hand set_data() views into it. Passing maxlen
+# keeps only the newest points so memory stays fixed however long it runs.
+from pointbuffer import PointBuffer
+points = PointBuffer(maxlen=None)
+def update_line(newData, l, points):
+    points.append(*newData)
+    l.set_data(points.x, points.y)
     return l,
 
 # Create a plot with some initial random data
@@ -311,9 +398,40 @@ def init_blit():
     return line,
 
 # Pass in our generator as the frames parameter
-anim = FuncAnimation(fig, update_line, frames=make_data, fargs=(line, x, y), interval=10,
+anim = FuncAnimation(fig, update_line, frames=make_data, fargs=(line, points), interval=10,
     blit=True, init_func=init_blit)
 
+# <markdowncell>
+
+# Producing a single point per frame spends most of the time in the Python loop and the random number generator. The generator can instead yield a whole block of points for each frame (chaos_game.py has one that does the work for each block in a few array operations), so the callback just needs to add the block to the buffer. This way each frame can add thousands of points at the same frame rate.
+
+# <codecell>
+
+from chaos_game import make_data_blocks
+
+# Only keep the most recent 200000 points
+points = PointBuffer(maxlen=200000)
+def update_line(newData, l, points):
+    newX, newY = newData
+    points.extend(newX, newY)
+    l.set_data(points.x, points.y)
+    return l,
+
+fig = plt.figure()
+ax = fig.add_subplot(1, 1, 1)
+line = Line2D([0], [0], markersize=1, color='m', marker='.', linestyle='none')
+ax.add_line(line)
+ax.set_xlim(0, 1)
+ax.set_ylim(0, 1)
+
+def init_blit():
+    line.set_data([], [])
+    return line,
+
+# Each frame adds 2000 new points
+anim = FuncAnimation(fig, update_line, frames=make_data_blocks(2000),
+    fargs=(line, points), interval=10, blit=True, init_func=init_blit)
+
 # <headingcell level=2>
 
 # Saving to file
@@ -383,46 +501,22 @@ anim = FuncAnimation(fig, update_lines, frames=t.size, fargs=(line1, line2, t, x
 
 # <codecell>
 
-# Double pendulum formula translated from the C code at
+# The double pendulum physics (derivs() and the constants) lives in
+# pendulum.py, translated from the C code at
 # http://www.physics.usyd.edu.au/~wheat/dpend_html/solve_dpend.c
+# pendulum_cache.py integrates it with scipy.integrate.odeint and keeps the
+# result in a cache on disk, so running this cell again with the same
+# initial state starts the animation straight away.
 
 from numpy import sin, cos, pi, array
 import numpy as np
 import matplotlib.pyplot as plt
-import scipy.integrate as integrate
 import matplotlib.animation as animation
 
-G =  9.8 # acceleration due to gravity, in m/s^2
-L1 = 1.0 # length of pendulum 1 in m
-L2 = 1.0 # length of pendulum 2 in m
-M1 = 1.0 # mass of pendulum 1 in kg
-M2 = 1.0 # mass of pendulum 2 in kg
-
+from pendulum_cache import trajectory
 
-def derivs(state, t):
-
-    dydx = np.zeros_like(state)
-    dydx[0] = state[1]
-
-    del_ = state[2]-state[0]
-    den1 = (M1+M2)*L1 - M2*L1*cos(del_)*cos(del_)
-    dydx[1] = (M2*L1*state[1]*state[1]*sin(del_)*cos(del_)
-               + M2*G*sin(state[2])*cos(del_) + M2*L2*state[3]*state[3]*sin(del_)
-               - (M1+M2)*G*sin(state[0]))/den1
-
-    dydx[2] = state[3]
-
-    den2 = (L2/L1)*den1
-    dydx[3] = (-M2*L2*state[3]*state[3]*sin(del_)*cos(del_)
-               + (M1+M2)*G*sin(state[0])*cos(del_)
-               - (M1+M2)*L1*state[1]*state[1]*sin(del_)
-               - (M1+M2)*G*sin(state[2]))/den2
-
-    return dydx
-
-# create a time array from 0..100 sampled at 0.1 second steps
+# sample the motion every 0.05 seconds for 20 seconds
 dt = 0.05
-t = np.arange(0.0, 20, dt)
 
 # th1 and th2 are the initial angles (degrees)
 # w10 and w20 are the initial angular velocities (degrees per second)
@@ -436,14 +530,9 @@ rad = pi/180
 # initial state
 state = np.array([th1, w1, th2, w2])*pi/180.
 
-# integrate your ODE using scipy.integrate.
-y = integrate.odeint(derivs, state, t)
-
-x1 = L1*sin(y[:,0])
-y1 = -L1*cos(y[:,0])
-
-x2 = L2*sin(y[:,2]) + x1
-y2 = -L2*cos(y[:,2]) + y1
+# integrate your ODE (or load the result of an earlier run) and get the
+# positions of the two bobs
+t, y, x1, y1, x2, y2 = trajectory(state, dt, duration=20.)
 
 fig = plt.figure()
 ax = fig.add_subplot(111, autoscale_on=False, xlim=(-2, 2), ylim=(-2, 2))
@@ -0,0 +1,329 @@
+# Panel labels ("Figure 1a", "(b)", ...) for figures with lots of panels.
+#
+# Axes_tutorial.py labels a panel with an AnchoredText, which is a small
+# offsetbox tree (an AnchoredOffsetbox holding a TextArea holding a Text)
+# with its own frame. Every draw, each one measures its text, works out its
+# size and padding, anchors itself to its axes and then draws its frame and
+# its text as separate artists. With a few hundred panels that's a few
+# hundred of these, all using the same font and the same placement.
+#
+# PanelLabels is a single artist holding all of the labels of a figure. They
+# share one font and one set of placement settings, so each distinct string
+# is measured only once, and the positions of all of the labels are worked
+# out in one go with numpy and kept until the panels move or the figure is
+# resized. Drawing is then one path for all of the frames plus the text. With
+# Agg, each distinct string is also only rendered once, into a small image
+# that is then stamped at every label using it; other (vector) backends get
+# ordinary draw_text() calls.
+#
+# Labels are single lines of plain (or math) text, unrotated; anything
+# fancier is what AnchoredText is for. With Agg the text is placed on whole
+# pixels, so it can sit up to half a pixel away from where AnchoredText puts
+# it.
+
+import time
+
+import numpy as np
+import matplotlib as mpl
+from matplotlib.artist import Artist
+from matplotlib.backends.backend_agg import RendererAgg
+from matplotlib.font_manager import FontProperties
+from matplotlib.offsetbox import AnchoredOffsetbox, TextArea
+from matplotlib.patches import BoxStyle
+from matplotlib.path import Path
+from matplotlib.transforms import IdentityTransform
+
+# Where each loc code puts the label within (the padded) axes, as fractions
+# of the space left over; same codes as AnchoredText and legend()
+_anchor_coefs = {1: (1., 1.), 2: (0., 1.), 3: (0., 0.), 4: (1., 0.),
+    5: (1., .5), 6: (0., .5), 7: (1., .5), 8: (.5, 0.), 9: (.5, 1.),
+    10: (.5, .5)}
+
+# Blank pixels kept around each rendered string, for antialiasing
+_margin = 2
+
+_box_codes = np.array([Path.MOVETO, Path.LINETO, Path.LINETO, Path.LINETO,
+    Path.CLOSEPOLY], dtype=Path.code_type)
+
+
+def _letters(n):
+    'a, b, ..., z, aa, ab, ... for n panels.'
+    letters = []
+    for i in range(n):
+        s = ''
+        i += 1
+        while i:
+            i, r = divmod(i - 1, 26)
+            s = chr(ord('a') + r) + s
+        letters.append(s)
+    return letters
+
+
+class PanelLabels(Artist):
+    '''
+    One artist drawing a text label anchored inside each of a number of
+    axes, all with the same font, frame and placement.
+
+    `loc`, `pad`, `borderpad` and `prop` (a FontProperties or a dict for
+    one, defaulting to the legend font size) are as for AnchoredText; the
+    frame is drawn with `boxstyle`, `facecolor`, `edgecolor` and
+    `linewidth` unless `frameon` is False. Labels are added with add().
+    '''
+    def __init__(self, loc='upper left', prop=None, pad=0.4, borderpad=0.5,
+            frameon=True, boxstyle='square,pad=0', color=None,
+            facecolor='w', edgecolor='k', linewidth=None, zorder=5):
+        Artist.__init__(self)
+        if isinstance(loc, str):
+            loc = AnchoredOffsetbox.codes[loc]
+        self.loc = loc
+        self.pad = pad
+        self.borderpad = borderpad
+        if prop is None:
+            prop = dict(size=mpl.rcParams['legend.fontsize'])
+        elif isinstance(prop, dict) and 'size' not in prop:
+            prop = dict(prop, size=mpl.rcParams['legend.fontsize'])
+        self.prop = FontProperties._from_any(prop)
+        self.frameon = frameon
+        self.boxstyle = BoxStyle(boxstyle) if isinstance(boxstyle, str) \
+            else boxstyle
+        self._square = (isinstance(self.boxstyle, BoxStyle.Square) and
+            self.boxstyle.pad == 0)
+        self.color = mpl.rcParams['text.color'] if color is None else color
+        self.facecolor = facecolor
+        self.edgecolor = edgecolor
+        if linewidth is None:
+            linewidth = mpl.rcParams['patch.linewidth']
+        self.linewidth = linewidth
+        self.set_zorder(zorder)
+
+        self._axes_list = []
+        self._texts = []
+        self._metrics = {}
+        self._sprites = {}
+        self._textarea = None
+        self._layout = None
+        self.stats = dict(draws=0, layouts=0, measured=0)
+
+    def __len__(self):
+        return len(self._texts)
+
+    def add(self, ax, text):
+        'Label the axes `ax` with the string `text`.'
+        self._axes_list.append(ax)
+        self._texts.append(text)
+        self._layout = None
+        self.stale = True
+
+    def set_text(self, ax, text):
+        'Change the label of `ax`.'
+        self._texts[self._axes_list.index(ax)] = text
+        self._layout = None
+        self.stale = True
+
+    def get_texts(self):
+        return list(self._texts)
+
+    def _measure(self, renderer, s):
+        # Width, ascent and descent of `s` in pixels, worked out by the same
+        # TextArea that AnchoredText uses, so they come out the same
+        key = (s, renderer.dpi)
+        metrics = self._metrics.get(key)
+        if metrics is None:
+            self.stats['measured'] += 1
+            if self._textarea is None:
+                self._textarea = TextArea('', textprops=dict(
+                    fontproperties=self.prop))
+            area = self._textarea
+            area.set_figure(self.get_figure(root=True))
+            area.set_text(s)
+            bbox = area.get_bbox(renderer)
+            ismath = area._text._preprocess_math(s)[1]
+            metrics = (bbox.width, bbox.y1, -bbox.y0, ismath)
+            self._metrics[key] = metrics
+        return metrics
+
+    def _sprite(self, renderer, s, ismath):
+        # `s` rendered once onto a transparent image (bottom row first, as
+        # draw_image() wants), plus how far the start of its baseline is
+        # from the left and bottom edges
+        key = (s, renderer.dpi, mpl.colors.to_rgba(self.color))
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            width, ascent, descent, _ = self._measure(renderer, s)
+            m = _margin
+            below = int(np.ceil(descent)) + m
+            w = int(np.ceil(width)) + 2 * m
+            h = int(np.ceil(ascent)) + below + m
+            scratch = RendererAgg(w, h, renderer.dpi)
+            gc = scratch.new_gc()
+            gc.set_foreground(self.color)
+            scratch.draw_text(gc, m, h - below, s, self.prop, 0,
+                ismath=ismath)
+            gc.restore()
+            image = np.asarray(scratch.buffer_rgba())
+            sprite = (image[::-1].copy(), m, below)
+            self._sprites[key] = sprite
+        return sprite
+
+    def _get_layout(self, renderer):
+        bounds = np.array([ax.bbox.bounds for ax in self._axes_list],
+            dtype=float).reshape(-1, 4)
+        key = (renderer.dpi, bounds.tobytes())
+        if self._layout is not None and self._layout[0] == key:
+            return self._layout[1]
+
+        self.stats['layouts'] += 1
+        metrics = [self._measure(renderer, s) for s in self._texts]
+        width = np.array([m[0] for m in metrics]).reshape(-1)
+        ascent = np.array([m[1] for m in metrics]).reshape(-1)
+        descent = np.array([m[2] for m in metrics]).reshape(-1)
+
+        fontsize = renderer.points_to_pixels(self.prop.get_size_in_points())
+        pad = self.pad * fontsize
+        border_x, border_y = np.broadcast_to(self.borderpad, 2) * fontsize
+        box_w = width + 2 * pad
+        box_h = ascent + descent + 2 * pad
+
+        # Anchor each box inside its axes shrunk by the border padding
+        cx, cy = _anchor_coefs[self.loc]
+        x0 = bounds[:, 0] + border_x + cx * (bounds[:, 2] - 2 * border_x -
+            box_w)
+        y0 = bounds[:, 1] + border_y + cy * (bounds[:, 3] - 2 * border_y -
+            box_h)
+        boxes = np.column_stack([x0, y0, box_w, box_h])
+        # Text goes in at its baseline
+        text_xy = np.column_stack([x0 + pad, y0 + pad + descent])
+
+        layout = (boxes, text_xy, [m[3] for m in metrics],
+            self._frame_path(boxes, fontsize))
+        self._layout = (key, layout)
+        return layout
+
+    def _frame_path(self, boxes, fontsize):
+        if not self.frameon or not len(boxes):
+            return None
+        if self._square:
+            x0, y0, w, h = boxes.T
+            x1 = x0 + w
+            y1 = y0 + h
+            verts = np.stack([np.column_stack(xy) for xy in
+                [(x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, y0)]], axis=1)
+            codes = np.tile(_box_codes, len(boxes))
+            return Path(verts.reshape(-1, 2), codes)
+        return Path.make_compound_path(*[self.boxstyle(x0, y0, w, h, fontsize)
+            for x0, y0, w, h in boxes])
+
+    def draw(self, renderer):
+        if not self.get_visible() or not self._texts:
+            return
+        self.stats['draws'] += 1
+        boxes, text_xy, ismath, frame = self._get_layout(renderer)
+        renderer.open_group('panellabels', gid=self.get_gid())
+
+        if frame is not None:
+            gc = renderer.new_gc()
+            gc.set_foreground(self.edgecolor)
+            gc.set_linewidth(self.linewidth)
+            gc.set_joinstyle('miter')
+            gc.set_snap(True)
+            face = mpl.colors.to_rgba(self.facecolor)
+            renderer.draw_path(gc, frame, IdentityTransform(), face)
+            gc.restore()
+
+        gc = renderer.new_gc()
+        gc.set_foreground(self.color)
+        gc.set_alpha(self.get_alpha())
+        if isinstance(renderer, RendererAgg):
+            for s, (x, y), math in zip(self._texts, text_xy, ismath):
+                image, left, below = self._sprite(renderer, s, math)
+                renderer.draw_image(gc, round(x) - left, round(y) - below,
+                    image)
+        else:
+            height = renderer.get_canvas_width_height()[1]
+            for s, (x, y), math in zip(self._texts, text_xy, ismath):
+                if renderer.flipy():
+                    y = height - y
+                renderer.draw_text(gc, x, y, s, self.prop, 0, ismath=math)
+        gc.restore()
+
+        renderer.close_group('panellabels')
+        self.stale = False
+
+
+def label_panels(fig, axes, labels=None, fmt='(%s)', **kwargs):
+    '''
+    Label each of `axes` (e.g. the array from plt.subplots()) using a single
+    PanelLabels artist added to `fig`, which is returned. `labels` defaults
+    to `fmt` applied to 'a', 'b', ... in order; other keyword arguments go
+    to PanelLabels.
+    '''
+    axes = list(np.ravel(axes))
+    if labels is None:
+        labels = [fmt % s for s in _letters(len(axes))]
+    panel_labels = PanelLabels(**kwargs)
+    for ax, text in zip(axes, labels):
+        panel_labels.add(ax, text)
+    fig.add_artist(panel_labels)
+    return panel_labels
+
+
+if __name__ == '__main__':
+    mpl.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.offsetbox import AnchoredText
+
+    repeat = 10
+
+    def make_grid(n):
+        fig, axes = plt.subplots(n, n, figsize=(n, n))
+        for ax in axes.flat:
+            # Keep the axes themselves cheap, so that the labels dominate
+            ax.set_axis_off()
+        return fig, axes
+
+    def draw_time(fig):
+        fig.canvas.draw()
+        start = time.time()
+        for i in range(repeat):
+            fig.canvas.draw()
+        return (time.time() - start) / repeat
+
+    def anchored(fig, axes):
+        for ax, text in zip(axes.flat, _letters(axes.size)):
+            at = AnchoredText('Figure 1%s' % text, loc=2, prop=dict(size=8),
+                frameon=True)
+            ax.add_artist(at)
+
+    def batched(fig, axes):
+        return label_panels(fig, axes, fmt='Figure 1%s', loc=2,
+            prop=dict(size=8))
+
+    print('draw time in ms (axes turned off)')
+    print('%6s %8s %14s %10s %12s' % ('grid', 'labels', 'AnchoredText',
+        'batched', 'no labels'))
+    for n in (5, 10, 15, 20):
+        fig, axes = make_grid(n)
+        t_none = draw_time(fig)
+        anchored(fig, axes)
+        t_anchored = draw_time(fig)
+        plt.close(fig)
+
+        fig, axes = make_grid(n)
+        labels = batched(fig, axes)
+        t_batched = draw_time(fig)
+        plt.close(fig)
+        print('%6s %8d %14.2f %10.2f %12.2f' % ('%dx%d' % (n, n), n * n,
+            1000 * t_anchored, 1000 * t_batched, 1000 * t_none))
+    print('last grid: %(draws)d draws, %(layouts)d layouts, %(measured)d '
+        'strings measured' % labels.stats)
+
+    # Check the placement against AnchoredText
+    fig, ax = plt.subplots()
+    at = AnchoredText('Figure 1a', loc=2, prop=dict(size=8), frameon=True)
+    ax.add_artist(at)
+    labels = label_panels(fig, [ax], ['Figure 1a'], loc=2, prop=dict(size=8))
+    fig.canvas.draw()
+    renderer = fig.canvas.get_renderer()
+    expected = at.get_window_extent(renderer).bounds
+    got = labels._get_layout(renderer)[0][0]
+    print('frame matches AnchoredText: %s' % np.allclose(expected, got))
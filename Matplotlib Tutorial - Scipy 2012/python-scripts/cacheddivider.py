@@ -0,0 +1,240 @@
+# Divider layouts that are worked out once instead of once per axes.
+#
+# Every axes placed by a Divider (or by make_axes_locatable() and
+# append_axes()) has a locator that, on every draw, asks every Size in the
+# horizontal and vertical lists for its value and redoes the arithmetic to
+# place the whole grid, just to pick out its own cell. For a Divider with
+# 100 cells that's the same layout solved 100 times per draw.
+#
+# CachedDivider and CachedAxesDivider split the sizes into the ones that
+# are constant (Size.Fixed and Size.Scaled) and the ones that depend on
+# something else (Size.AxesX, a "33%" Fraction of it, ...). The constant
+# ones are looked up once, when the sizes are set. Each locator call then
+# only needs the varying sizes, the figure size and DPI, and the position of
+# the divider; as long as those are the same as last time, the solved
+# offsets are reused, so a draw solves the layout once and a resize solves
+# it again.
+#
+# Changing a Size object in place (rather than through set_horizontal()
+# etc.) isn't noticed; call invalidate() after doing that.
+
+import time
+
+import numpy as np
+from matplotlib.transforms import Bbox
+from mpl_toolkits.axes_grid1 import Size
+from mpl_toolkits.axes_grid1.axes_divider import AxesDivider, Divider
+
+_constant = (Size.Fixed, Size.Scaled)
+
+
+class _Plan(object):
+    # The sizes along one direction: a (n, 2) table of (relative, absolute)
+    # sizes with the constant entries filled in, and which entries vary.
+    def __init__(self, sizes):
+        self.sizes = list(sizes)
+        self.varying = [i for i, s in enumerate(self.sizes)
+            if type(s) not in _constant]
+        self.table = np.zeros((len(self.sizes), 2))
+        for i, s in enumerate(self.sizes):
+            if type(s) in _constant:
+                self.table[i] = s.get_size(None)
+
+    def values(self, renderer):
+        return tuple(tuple(self.sizes[i].get_size(renderer))
+            for i in self.varying)
+
+    def solve(self, values, total=None, k=None):
+        'Returns the scale factor k and the offsets of the cell edges.'
+        table = self.table
+        if self.varying:
+            table = table.copy()
+            table[self.varying] = values
+        if k is None:
+            rel_sum, abs_sum = table.sum(0)
+            k = (total - abs_sum) / rel_sum if rel_sum else 0
+        return k, np.concatenate([[0], np.cumsum(table @ [k, 1])])
+
+
+class _CachedLayout(object):
+    # Replaces Divider._locate() with one working from a cached solution.
+    # Mixed in ahead of Divider or AxesDivider.
+
+    def invalidate(self):
+        'Forget the solved layout and the constant sizes.'
+        self._plans = None
+        self._solution = None
+
+    def _changed(self):
+        # Divider.__init__ calls set_anchor() before there's anything to
+        # forget
+        if getattr(self, '_plans', False) is not False:
+            self.invalidate()
+
+    def _get_plans(self):
+        if getattr(self, '_plans', None) is None:
+            self._plans = (_Plan(self.get_horizontal()),
+                _Plan(self.get_vertical()))
+        return self._plans
+
+    def set_horizontal(self, h):
+        Divider.set_horizontal(self, h)
+        self._changed()
+
+    def set_vertical(self, v):
+        Divider.set_vertical(self, v)
+        self._changed()
+
+    def set_position(self, pos):
+        Divider.set_position(self, pos)
+        self._changed()
+
+    def set_aspect(self, aspect=False):
+        Divider.set_aspect(self, aspect)
+        self._changed()
+
+    def set_anchor(self, anchor):
+        Divider.set_anchor(self, anchor)
+        self._changed()
+
+    def append_size(self, position, size):
+        Divider.append_size(self, position, size)
+        self._changed()
+
+    def _solve(self, axes, renderer):
+        hplan, vplan = self._get_plans()
+        fig_w, fig_h = self._fig.bbox.size / self._fig.dpi
+        pos = tuple(self.get_position_runtime(axes, renderer))
+        hvalues = hplan.values(renderer)
+        vvalues = vplan.values(renderer)
+        aspect = self.get_aspect()
+        anchor = self.get_anchor()
+        key = (fig_w, fig_h, pos, hvalues, vvalues, aspect, anchor)
+
+        self.stats['lookups'] += 1
+        if self._solution is not None and self._solution[0] == key:
+            return self._solution[1]
+
+        self.stats['solves'] += 1
+        x, y, w, h = pos
+        k_h, ox = hplan.solve(hvalues, total=fig_w * w)
+        k_v, oy = vplan.solve(vvalues, total=fig_h * h)
+        if aspect:
+            k = min(k_h, k_v)
+            _, ox = hplan.solve(hvalues, k=k)
+            _, oy = vplan.solve(vvalues, k=k)
+            pb = Bbox.from_bounds(x, y, w, h)
+            pb1 = Bbox.from_bounds(x, y, (ox[-1] - ox[0]) / fig_w,
+                (oy[-1] - oy[0]) / fig_h)
+            x, y = pb1.anchored(anchor, pb).p0
+        # Cell edges in figure coordinates
+        solution = (x + ox / fig_w, y + oy / fig_h)
+        self._solution = (key, solution)
+        return solution
+
+    def _locate(self, nx, ny, nx1, ny1, axes, renderer):
+        nx += self._xrefindex
+        nx1 += self._xrefindex
+        ny += self._yrefindex
+        ny1 += self._yrefindex
+        xs, ys = self._solve(axes, renderer)
+        return Bbox.from_extents(xs[nx], ys[ny], xs[nx1], ys[ny1])
+
+
+class CachedDivider(_CachedLayout, Divider):
+    '''
+    A Divider that only solves its layout when the figure size, DPI,
+    position or varying sizes change. Same arguments as Divider.
+
+    `stats` counts the locator calls ('lookups') and the layouts actually
+    solved ('solves').
+    '''
+    def __init__(self, *args, **kwargs):
+        self.stats = dict(lookups=0, solves=0)
+        Divider.__init__(self, *args, **kwargs)
+        self.invalidate()
+
+
+class CachedAxesDivider(_CachedLayout, AxesDivider):
+    'AxesDivider version of CachedDivider, see make_axes_locatable().'
+    def __init__(self, *args, **kwargs):
+        self.stats = dict(lookups=0, solves=0)
+        AxesDivider.__init__(self, *args, **kwargs)
+        self.invalidate()
+
+
+def make_axes_locatable(axes):
+    '''
+    Same as mpl_toolkits.axes_grid1.make_axes_locatable(), but using a
+    CachedAxesDivider.
+    '''
+    divider = CachedAxesDivider(axes)
+    axes.set_axes_locator(divider.new_locator(nx=0, ny=0))
+    return divider
+
+
+if __name__ == '__main__':
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    repeat = 20
+
+    def locate_time(fig, axes):
+        # Time just the locator calls made by a draw
+        renderer = fig.canvas.get_renderer()
+        start = time.time()
+        for i in range(repeat):
+            for ax in axes:
+                ax.get_axes_locator()(ax, renderer)
+        return (time.time() - start) / repeat
+
+    def grid(divider_class, n=10):
+        fig = plt.figure(figsize=(10, 10))
+        horiz = []
+        vert = []
+        for i in range(n):
+            horiz += [Size.Scaled(1 + i % 3), Size.Fixed(0.1)]
+            vert += [Size.Scaled(1), Size.Fixed(0.1)]
+        div = divider_class(fig, (0.05, 0.05, 0.9, 0.9), horiz, vert,
+            aspect=False)
+        axes = []
+        for i in range(n):
+            for j in range(n):
+                ax = fig.add_axes((0, 0, 1, 1))
+                ax.set_axes_locator(div.new_locator(nx=2 * i, ny=2 * j))
+                axes.append(ax)
+        return fig, axes, div
+
+    def chain(locatable, n=8):
+        fig = plt.figure(figsize=(10, 4))
+        ax = fig.add_subplot(1, 1, 1)
+        divider = locatable(ax)
+        axes = [ax]
+        for i in range(n):
+            axes.append(divider.append_axes('right', size='33%', pad=0.2))
+        return fig, axes, divider
+
+    from mpl_toolkits.axes_grid1 import make_axes_locatable as plain_locatable
+    for name, build, plain, cached in [
+            ('100 cell Divider', grid, Divider, CachedDivider),
+            ('append_axes x 8', chain, plain_locatable, make_axes_locatable)]:
+        fig, axes, div = build(plain)
+        fig.canvas.draw()
+        before = [ax.get_position().bounds for ax in axes]
+        t_plain = locate_time(fig, axes)
+        plt.close(fig)
+
+        fig, axes, div = build(cached)
+        fig.canvas.draw()
+        after = [ax.get_position().bounds for ax in axes]
+        t_cached = locate_time(fig, axes)
+        fig.set_size_inches(8, 8)
+        fig.canvas.draw()
+        plt.close(fig)
+
+        assert np.allclose(before, after)
+        print('%s: %.2f ms per draw plain, %.2f ms cached' % (name,
+            1000 * t_plain, 1000 * t_cached))
+        print('  %(lookups)d locator calls, %(solves)d solves (including '
+            'one resize)' % div.stats)
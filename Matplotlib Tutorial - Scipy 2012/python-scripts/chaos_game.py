@@ -0,0 +1,47 @@
+# The chaos game for the Sierpinski triangle, as used for the procedural
+# FuncAnimation example in Animations_tutorial.py.
+#
+# Based on this blog post:
+# http://glowingpython.blogspot.com/2011/06/animation-with-matplotlib-bringin.html
+
+import numpy as np
+from scipy.signal import lfilter
+
+# Each step moves halfway towards one of the corners of the triangle
+A = np.array([ [.5, 0], [0, .5] ])
+b1 = np.array([0, 0])
+b2 = np.array([.5, 0])
+b3 = np.array([.25, np.sqrt(3)/4])
+B = np.array([b1, b2, b3])
+
+
+# Generator for producing new data, one point at a time
+def make_data():
+    x = np.array([0, 0])
+    while True:
+        x = np.dot(A, x) + B[np.random.randint(0, 3)]
+        yield x
+
+
+def make_data_blocks(k=1000):
+    '''
+    Generator producing the same sequence of points as make_data(), but `k`
+    at a time. Each next() returns a tuple of x and y arrays of length k.
+
+    All k corner choices come from a single call to the random number
+    generator. Since A is diagonal, each coordinate follows its own
+    recurrence x[n] = a * x[n - 1] + b[n], which is exactly a first order
+    IIR filter, so lfilter runs the whole block in one pass.
+    '''
+    scale = np.diag(A)
+    x = np.zeros(2)
+    while True:
+        offsets = B[np.random.randint(0, 3, k)]
+        block = []
+        for axis in range(2):
+            # zi carries the last point of the previous block into the filter
+            pts, _ = lfilter([1.], [1., -scale[axis]], offsets[:, axis],
+                zi=[scale[axis] * x[axis]])
+            block.append(pts)
+        x = np.array([block[0][-1], block[1][-1]])
+        yield block[0], block[1]
@@ -0,0 +1,280 @@
+# Drawing lines with far more points than there are pixels to show them.
+#
+# With millions of points per panel, as in a subplots() grid of long time
+# series, Agg spends most of its time drawing segments that land on the same
+# pixel column. DecimatedLine keeps the full data but, each time it is
+# drawn, hands matplotlib only the minimum and maximum point within each
+# pixel column of the current view, in their original order: about twice as
+# many vertices as the axes is pixels wide. The line's data itself is not
+# changed, so get_data() and relim() still see all of it.
+#
+# This keeps the vertical extent of the line in every column, so the picture
+# looks much the same, but it isn't identical: the antialiased segments
+# joining the columns start and end at different points, which moves many
+# of the line's edge pixels. The 'm4' method also keeps the first and last
+# point of each column, for twice as many vertices, and comes a little
+# closer. The demo below measures how much differs (about a tenth of the
+# line's pixels for a long random walk).
+#
+# To avoid scanning all of the data on every draw, the extrema are also
+# precomputed over blocks of 8, 64, 512... points, built as they are first
+# needed. A draw picks the coarsest level that still has several points per
+# pixel column in view, so zooming or resizing only looks at a small summary
+# of the data. (A block that straddles two columns can put its extremes in
+# the neighbouring column, which is at most a pixel off.)
+#
+# The x data must be sorted, as it is for time series.
+
+import time
+
+import numpy as np
+from matplotlib.lines import Line2D, STEP_LOOKUP_MAP
+from matplotlib.path import Path
+from matplotlib.transforms import TransformedPath
+
+
+def _block_extrema(y, size):
+    # Indices of the first, minimum, maximum and last point of every block of
+    # `size` points, in order.
+    n = len(y)
+    nfull = n // size
+    idx = np.empty((nfull + (n > nfull * size), 4), dtype=np.intp)
+    if nfull:
+        blocks = y[:nfull * size].reshape(nfull, size)
+        base = np.arange(nfull) * size
+        idx[:nfull, 0] = base
+        idx[:nfull, 1] = base + blocks.argmin(axis=1)
+        idx[:nfull, 2] = base + blocks.argmax(axis=1)
+        idx[:nfull, 3] = base + size - 1
+    if n > nfull * size:
+        start = nfull * size
+        tail = y[start:]
+        idx[-1] = (start, start + tail.argmin(), start + tail.argmax(), n - 1)
+    # Sorting within each block is enough to put everything in order
+    idx.sort(axis=1)
+    idx = idx.ravel()
+    return idx[np.r_[True, idx[1:] != idx[:-1]]]
+
+
+def _column_extrema(col, y, keep_ends):
+    # Given the (sorted) pixel column of each point, pick out the indices of
+    # the min and max (and optionally first and last) point in each column.
+    starts = np.r_[0, np.flatnonzero(np.diff(col)) + 1]
+    counts = np.diff(np.r_[starts, len(col)])
+    seg = np.repeat(np.arange(len(starts)), counts)
+
+    picks = []
+    for reduce in (np.minimum, np.maximum):
+        hits = np.flatnonzero(y == reduce.reduceat(y, starts)[seg])
+        first = np.r_[True, seg[hits[1:]] != seg[hits[:-1]]]
+        picks.append(hits[first])
+    if keep_ends:
+        picks.append(starts)
+        picks.append(starts + counts - 1)
+    return np.unique(np.concatenate(picks))
+
+
+class Pyramid(object):
+    '''
+    Multi-resolution summary of a line with sorted `x`.
+
+    Level 0 is the data itself and level k keeps the first, minimum, maximum
+    and last point of each block of factor**k points. Levels are built the
+    first time they are used.
+    '''
+    def __init__(self, x, y, factor=8):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        if self.x.shape != self.y.shape or self.x.ndim != 1:
+            raise ValueError('x and y must be 1D arrays of the same length')
+        if len(self.x) > 1 and np.any(self.x[1:] < self.x[:-1]):
+            raise ValueError('x must be sorted to decimate')
+        self.factor = factor
+        self._levels = {0: None}
+
+    def __len__(self):
+        return len(self.x)
+
+    def level(self, k):
+        'Indices of the points kept at level k (None for all of them).'
+        if k not in self._levels:
+            self._levels[k] = _block_extrema(self.y, self.factor ** k)
+        return self._levels[k]
+
+    def decimate(self, x0, x1, width, method='minmax'):
+        '''
+        Points to draw for the x range (x0, x1) over `width` pixel columns.
+        Returns x and y arrays, including the nearest point outside the range
+        on each side so that the line carries on to the edges.
+        '''
+        x = self.x
+        i0 = max(np.searchsorted(x, x0, 'left') - 1, 0)
+        i1 = min(np.searchsorted(x, x1, 'right') + 1, len(x))
+        width = max(int(width), 1)
+        if i1 - i0 <= 2 * width:
+            return x[i0:i1], self.y[i0:i1]
+
+        # Coarsest level with at least 8 points per column in view
+        k = 0
+        while (i1 - i0) // self.factor ** (k + 1) >= 8 * width:
+            k += 1
+        idx = self.level(k)
+        if idx is None:
+            idx = np.arange(i0, i1)
+        else:
+            idx = idx[np.searchsorted(idx, i0):np.searchsorted(idx, i1)]
+
+        xs = x[idx]
+        ys = self.y[idx]
+        scale = width / float(x1 - x0) if x1 > x0 else 0.
+        col = np.clip(((xs - x0) * scale).astype(np.intp), -1, width)
+        keep = _column_extrema(col, ys, method == 'm4')
+        return xs[keep], ys[keep]
+
+
+class DecimatedLine(Line2D):
+    '''
+    A Line2D for `x`, `y` data with sorted x that only ever draws a min/max
+    decimated version of the points in view, recomputed when the view
+    limits or the size of the axes change.
+
+    The line's data (get_data(), set_data(), relim() and autoscaling) is
+    still all of the points; only the path that is drawn is decimated.
+    `method` is 'minmax' (about 2 vertices per pixel column) or 'm4' (up to
+    4). Other keyword arguments are Line2D properties.
+    '''
+    def __init__(self, x, y, method='minmax', **kwargs):
+        self.method = method
+        self._pyramid = None
+        self._view = None
+        Line2D.__init__(self, x, y, **kwargs)
+
+    def recache(self, always=False):
+        Line2D.recache(self, always)
+        # Decimating replaces matplotlib's own subslicing of long lines
+        self._subslice = False
+        self._pyramid = Pyramid(self._x, self._y)
+        self._view = None
+
+    def _transform_path(self, subslice=None):
+        if self._view is None or not len(self._pyramid):
+            # Not drawn yet (or nothing to decimate)
+            Line2D._transform_path(self)
+            return
+        x, y = self._pyramid.decimate(self._view[0], self._view[1],
+            self._view[2], self.method)
+        if self._drawstyle == 'default':
+            vertices = np.column_stack([x, y])
+        else:
+            vertices = np.asarray(STEP_LOOKUP_MAP[self._drawstyle](x, y)).T
+        path = Path(vertices,
+            _interpolation_steps=self._path._interpolation_steps)
+        self._transformed_path = TransformedPath(path, self.get_transform())
+
+    def draw(self, renderer):
+        if self._invalidx or self._invalidy:
+            self.recache()
+        ax = self.axes
+        if ax is not None:
+            x0, x1 = ax.get_xbound()
+            view = (x0, x1, int(ax.bbox.width), self.method)
+            if view != self._view:
+                self._view = view
+                self._transform_path()
+        Line2D.draw(self, renderer)
+
+
+def decimated_plot(ax, x, y, **kwargs):
+    '''
+    Add a DecimatedLine for x, y to `ax` and rescale the view, a bit like
+    ax.plot(x, y). Keyword arguments are passed on to DecimatedLine.
+    '''
+    if 'color' not in kwargs:
+        kwargs['color'] = ax._get_lines.get_next_color()
+    line = DecimatedLine(x, y, **kwargs)
+    ax.add_line(line)
+    ax.autoscale_view()
+    return line
+
+
+def decimate_lines(ax, min_points=10000, method='minmax'):
+    '''
+    Replace every line on `ax` with more than `min_points` points and sorted
+    x data by an equivalent DecimatedLine. Returns the new lines.
+    '''
+    new = []
+    for line in list(ax.lines):
+        if isinstance(line, DecimatedLine):
+            continue
+        x, y = line.get_xdata(), line.get_ydata()
+        if len(x) <= min_points or np.any(np.diff(x) < 0):
+            continue
+        dline = DecimatedLine(x, y, method=method)
+        dline.update_from(line)
+        dline.set_label(line.get_label())
+        line.remove()
+        ax.add_line(dline)
+        new.append(dline)
+    return new
+
+
+if __name__ == '__main__':
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    npoints = 10 ** 6
+    x = np.linspace(0, 1000, npoints)
+    y = np.cumsum(np.random.randn(9, npoints), axis=1)
+
+    def draw_time(fig, repeat=3):
+        start = time.time()
+        for i in range(repeat):
+            fig.canvas.draw()
+        return (time.time() - start) / repeat
+
+    print('3x3 grid, %d points per panel' % npoints)
+    fig, axes = plt.subplots(3, 3, sharex=True)
+    for i, ax in enumerate(axes.flat):
+        ax.plot(x, y[i])
+    print('plain:     %.3f s per draw' % draw_time(fig))
+    axes[0, 0].set_xlim(400, 410)
+    print('  zoomed:  %.3f s per draw' % draw_time(fig))
+    plt.close(fig)
+
+    fig, axes = plt.subplots(3, 3, sharex=True)
+    for i, ax in enumerate(axes.flat):
+        decimated_plot(ax, x, y[i])
+    # The first draw at a new zoom level builds the pyramid levels it needs
+    print('decimated: %.3f s first draw' % draw_time(fig, 1))
+    print('           %.3f s per draw' % draw_time(fig))
+    axes[0, 0].set_xlim(400, 410)
+    print('  zoomed:  %.3f s first draw' % draw_time(fig, 1))
+    axes[0, 0].set_xlim(600, 610)
+    print('           %.3f s per draw' % draw_time(fig))
+    plt.close(fig)
+
+    def image(plot, xlim):
+        fig = plt.figure()
+        ax = fig.add_subplot(1, 1, 1)
+        plot(ax)
+        ax.set_xlim(*xlim)
+        fig.canvas.draw()
+        image = np.asarray(fig.canvas.buffer_rgba())[..., :3].astype(int)
+        plt.close(fig)
+        return image
+
+    # Pixels of the line (those that differ from empty axes in either
+    # picture) more than 60/255 away from the full line's
+    print('line pixels off by more than 60/255:')
+    for xlim in [(0, 1000), (400, 410)]:
+        blank = image(lambda ax: None, xlim)
+        full = image(lambda ax: ax.plot(x, y[0]), xlim)
+        row = []
+        for method in ('minmax', 'm4'):
+            dec = image(lambda ax: decimated_plot(ax, x, y[0],
+                method=method), xlim)
+            line = (full != blank).any(-1) | (dec != blank).any(-1)
+            off = np.abs(full - dec).max(-1)[line] > 60
+            row.append('%s %4.1f%%' % (method, 100 * off.mean()))
+        print('  x in %-11s %s' % ('(%d, %d)' % xlim, ', '.join(row)))
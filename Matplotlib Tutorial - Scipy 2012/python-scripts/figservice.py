@@ -0,0 +1,276 @@
+# Making lots of figures from a batch job without pyplot.
+#
+# OO_Matplotlib_tutorial.py gets a figure without going through pyplot's
+# state machine with new_figure_manager(1).canvas.figure, but that ties it
+# to backend_qt4agg (and a GUI toolkit). For images that only ever end up
+# in files, new_figure() below makes a Figure with an Agg canvas directly:
+# no pyplot, no figure manager, no GUI, and nothing to close afterwards.
+#
+# Starting a fresh Python for each figure means paying for importing
+# numpy and matplotlib, and for finding and loading fonts, every time;
+# that's usually a lot longer than drawing a simple plot. FigureService
+# keeps a set of worker processes running instead. Each one imports
+# matplotlib and draws a throwaway figure with some text when it starts,
+# so that the fonts and renderer are warmed up, then waits on a queue for
+# PlotSpecs, draws them and sends back the encoded image (PNG by default)
+# as bytes.
+#
+# Specs (and the arrays in them) are pickled to get to the workers, so very
+# large datasets are better written somewhere the workers can read them.
+#
+# A worker that dies (killed, out of memory, a crash in a C extension)
+# takes the spec it was drawing with it. Waiting for results checks on the
+# workers every so often, and raises RuntimeError instead of waiting
+# forever if one of them has gone; the service can't be used after that.
+
+import io
+import multiprocessing
+import queue
+import time
+import traceback
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+def new_figure(**kwargs):
+    '''
+    A Figure with an Agg canvas, made without pyplot. Keyword arguments go
+    to Figure (figsize, dpi, ...).
+    '''
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+class PlotSpec(object):
+    '''
+    Picklable description of a single-axes plot.
+
+    `kind` is the name of an Axes plotting method ('scatter', 'step',
+    'plot', ...) which is called with `args` and `kwargs`. `axes_kw` is
+    passed to ax.set() afterwards (title, xlim, ...), `fig_kw` to Figure
+    and `savefig_kw` to savefig(), along with `format`.
+    '''
+    def __init__(self, kind, args=(), kwargs=None, axes_kw=None, fig_kw=None,
+            format='png', savefig_kw=None):
+        self.kind = kind
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.axes_kw = axes_kw or {}
+        self.fig_kw = fig_kw or {}
+        self.format = format
+        self.savefig_kw = savefig_kw or {}
+
+    def render(self):
+        'Draw the plot and return the encoded image as bytes.'
+        fig = new_figure(**self.fig_kw)
+        ax = fig.add_subplot(1, 1, 1)
+        getattr(ax, self.kind)(*self.args, **self.kwargs)
+        if self.axes_kw:
+            ax.set(**self.axes_kw)
+        buf = io.BytesIO()
+        fig.savefig(buf, format=self.format, **self.savefig_kw)
+        return buf.getvalue()
+
+
+def _warm_up():
+    # Load the fonts, fill the text caches and import the image encoder
+    # before the first real spec comes in
+    spec = PlotSpec('plot', ([0, 1], [0, 1]),
+        axes_kw=dict(title='warm up $x^2$', xlabel='x', ylabel='y'))
+    spec.render()
+
+
+def _serve(tasks, results):
+    _warm_up()
+    results.put(None)
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job, spec = task
+        start = time.time()
+        try:
+            data = spec.render()
+        except Exception:
+            results.put((job, False, traceback.format_exc(), 0.0))
+        else:
+            results.put((job, True, data, time.time() - start))
+
+
+class FigureService(object):
+    '''
+    A pool of `processes` (default: one per CPU) long-lived workers that
+    render PlotSpecs. Start-up waits until every worker has warmed up.
+
+    Use render() for one spec or map() for many, then close() (or use it
+    as a context manager). `stats` counts the figures rendered and the
+    time the workers spent rendering them. Waiting for a worker checks
+    every `poll` seconds that none of them have died.
+    '''
+    poll = 0.5
+
+    def __init__(self, processes=None, context=None):
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        ctx = multiprocessing.get_context(context)
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._workers = [ctx.Process(target=_serve,
+            args=(self._tasks, self._results), daemon=True)
+            for i in range(processes)]
+        self._next_job = 0
+        self._done = {}
+        self.stats = dict(figures=0, render=0.0)
+
+        start = time.time()
+        for worker in self._workers:
+            worker.start()
+        for worker in self._workers:
+            self._get_result()
+        self.stats['startup'] = time.time() - start
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _get_result(self):
+        while True:
+            try:
+                return self._results.get(timeout=self.poll)
+            except queue.Empty:
+                pass
+            if not self._workers:
+                raise RuntimeError('The FigureService has been closed')
+            for worker in self._workers:
+                if not worker.is_alive():
+                    raise RuntimeError('Worker process %d died (exit code %s)'
+                        % (worker.pid, worker.exitcode))
+
+    def submit(self, spec):
+        'Queue `spec` for rendering, returning a job number for result().'
+        job = self._next_job
+        self._next_job += 1
+        self._tasks.put((job, spec))
+        return job
+
+    def result(self, job):
+        'Wait for and return the bytes for the job number `job`.'
+        while job not in self._done:
+            done, ok, data, elapsed = self._get_result()
+            self._done[done] = (ok, data)
+            self.stats['figures'] += 1
+            self.stats['render'] += elapsed
+        ok, data = self._done.pop(job)
+        if not ok:
+            raise RuntimeError('Rendering failed in a worker:\n%s' % data)
+        return data
+
+    def render(self, spec):
+        'Render a single spec, returning the encoded bytes.'
+        return self.result(self.submit(spec))
+
+    def map(self, specs):
+        '''
+        Render all of `specs`, yielding the encoded bytes for each in
+        order. All of the specs are queued up front, so the workers keep
+        busy while the results are being handled.
+        '''
+        jobs = [self.submit(spec) for spec in specs]
+        for job in jobs:
+            yield self.result(job)
+
+    def close(self):
+        '''
+        Stop the workers, once they have drawn any specs still queued.
+        Results that haven't been collected with result() are dropped.
+        '''
+        for worker in self._workers:
+            self._tasks.put(None)
+        while any(worker.is_alive() for worker in self._workers):
+            if any(worker.exitcode not in (None, 0)
+                    for worker in self._workers):
+                # One died, maybe holding the task queue's lock, so the
+                # rest might never get their None. Specs still in the queue
+                # are dropped rather than waited on at exit.
+                for worker in self._workers:
+                    worker.terminate()
+                self._tasks.cancel_join_thread()
+                break
+            # A worker can't exit until everything it has put on the
+            # results queue has been read
+            try:
+                self._results.get(timeout=self.poll)
+            except queue.Empty:
+                pass
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+
+def _example_specs(n, seed=0):
+    # Alternating scatter and step plots, like the OO tutorial's exercises
+    rng = np.random.RandomState(seed)
+    specs = []
+    for i in range(n):
+        if i % 2:
+            x = np.arange(20)
+            specs.append(PlotSpec('step', (x, rng.rand(20).cumsum()),
+                axes_kw=dict(title='Step %d' % i), fig_kw=dict(figsize=(4, 3))))
+        else:
+            x, y = rng.randn(2, 200)
+            specs.append(PlotSpec('scatter', (x, y),
+                axes_kw=dict(xlim=(-2, 2), title='Gaussian Data %d' % i),
+                fig_kw=dict(figsize=(4, 3))))
+    return specs
+
+
+if __name__ == '__main__':
+    import subprocess
+    import sys
+
+    script = ('import io, numpy as np; import matplotlib; '
+        'matplotlib.use("Agg"); import matplotlib.pyplot as plt; '
+        'x, y = np.random.randn(2, 200); fig = plt.figure(figsize=(4, 3)); '
+        'ax = fig.add_subplot(1, 1, 1); ax.scatter(x, y); '
+        'ax.set_xlim(-2, 2); ax.set_title("Gaussian Data"); '
+        'fig.savefig(io.BytesIO(), format="png")')
+    ncold = 5
+    start = time.time()
+    for i in range(ncold):
+        subprocess.check_call([sys.executable, '-c', script])
+    cold = (time.time() - start) / ncold
+
+    n = 200
+    specs = _example_specs(n)
+    start = time.time()
+    for spec in specs:
+        spec.render()
+    serial = (time.time() - start) / n
+
+    with FigureService() as service:
+        start = time.time()
+        for spec in specs[:20]:
+            service.render(spec)
+        latency = (time.time() - start) / 20
+
+        start = time.time()
+        images = list(service.map(specs))
+        pooled = time.time() - start
+        assert all(image.startswith(b'\x89PNG') for image in images)
+        startup = service.stats['startup']
+        nproc = len(service._workers)
+
+    print('%-34s %10s %12s' % ('', 'ms/figure', 'figures/hour'))
+    for name, per_figure in [
+            ('new python process per figure', cold),
+            ('in process, no pool', serial),
+            ('FigureService, one at a time', latency),
+            ('FigureService.map(), %d workers' % nproc, pooled / n)]:
+        print('%-34s %10.1f %12d' % (name, 1000 * per_figure,
+            3600 / per_figure))
+    print('worker start-up (paid once): %.2f s' % startup)
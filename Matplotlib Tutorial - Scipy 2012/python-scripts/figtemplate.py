@@ -0,0 +1,200 @@
+# Re-using one figure for many renders that only differ in their data.
+#
+# The OO tutorial builds each plot from scratch: a Figure, an Axes, a
+# scatter(), then the limits and the title. A report that draws the same
+# plot for thousands of datasets repeats all of that, and also redraws the
+# parts that never change (the frame, ticks, labels and title) every time.
+#
+# A FigureTemplate wraps a figure that has been built once, with some of
+# its artists registered as named data slots. The first render draws
+# everything except the slots and keeps the result as a background, the way
+# blitting does in the animation tutorial. Rendering a new dataset then
+# sets the new arrays on the existing slot artists, restores the background
+# and draws just those artists on top.
+#
+# Since the background is reused, the axes limits are fixed when the
+# template is made (autoscaling is turned off) and anything outside of the
+# slots has to stay the same; call invalidate() after changing any of it.
+# The slots are also drawn over the whole background, so data running into
+# the axes frame ends up on top of it rather than underneath.
+
+import io
+import time
+
+import numpy as np
+from matplotlib.collections import Collection
+from matplotlib.image import AxesImage, imsave
+from matplotlib.lines import Line2D
+from matplotlib.text import Text
+
+from figservice import new_figure
+
+
+def _set_xy(artist, value):
+    x, y = value
+    artist.set_data(x, y)
+
+
+def _set_offsets(artist, value):
+    if isinstance(value, tuple):
+        value = np.column_stack(value)
+    artist.set_offsets(value)
+
+
+# How to put new data into each kind of artist; looked up along the MRO
+_setters = {
+    Line2D: _set_xy,
+    Collection: _set_offsets,
+    AxesImage: lambda artist, value: artist.set_data(value),
+    Text: lambda artist, value: artist.set_text(value),
+}
+
+
+def _find_setter(artist):
+    for cls in type(artist).__mro__:
+        if cls in _setters:
+            return _setters[cls]
+    raise TypeError('No way to set data on a %s' % type(artist).__name__)
+
+
+class FigureTemplate(object):
+    '''
+    A figure drawn once, with named data slots that new data can be rendered
+    into. Slots are added with add_slot(), or as keyword arguments here.
+
+    What a slot takes depends on its artist: (x, y) for a line, (x, y) or
+    an (N, 2) array of offsets for a collection (e.g. from scatter()), an
+    array for an image and a string for a Text. `stats` counts the renders
+    and how many of them needed the background drawing.
+    '''
+    def __init__(self, fig, **slots):
+        self.fig = fig
+        self._slots = {}
+        self._background = None
+        self.stats = dict(renders=0, backgrounds=0)
+        for ax in fig.axes:
+            ax.set_autoscale_on(False)
+        for name, artist in slots.items():
+            self.add_slot(name, artist)
+
+    def __contains__(self, name):
+        return name in self._slots
+
+    def add_slot(self, name, artist):
+        'Make `artist` (which must be in the figure) the data slot `name`.'
+        if isinstance(artist, list) and len(artist) == 1:
+            # What plot() returns
+            artist, = artist
+        artist.set_animated(True)
+        self._slots[name] = (artist, _find_setter(artist))
+        self.invalidate()
+
+    def get_slot(self, name):
+        return self._slots[name][0]
+
+    def invalidate(self):
+        'Drop the cached background, e.g. after changing a title.'
+        self._background = None
+
+    def _get_background(self):
+        canvas = self.fig.canvas
+        key = canvas.get_width_height(), self.fig.dpi
+        if self._background is None or self._background[0] != key:
+            self.stats['backgrounds'] += 1
+            canvas.draw()
+            self._background = key, canvas.copy_from_bbox(self.fig.bbox)
+        return self._background[1]
+
+    def update(self, **data):
+        'Set the data of the named slots, without drawing.'
+        for name, value in data.items():
+            artist, setter = self._slots[name]
+            setter(artist, value)
+
+    def render(self, **data):
+        '''
+        Set the data of the named slots (others keep their current data)
+        and draw the figure, returning it as a new RGBA array.
+        '''
+        return self._draw(**data).copy()
+
+    def _draw(self, **data):
+        # The canvas buffer itself, which the next render draws over
+        self.update(**data)
+        background = self._get_background()
+        canvas = self.fig.canvas
+        canvas.restore_region(background)
+        artists = sorted((artist for artist, setter in self._slots.values()),
+            key=lambda artist: artist.get_zorder())
+        for artist in artists:
+            if artist.get_visible():
+                self.fig.draw_artist(artist)
+        self.stats['renders'] += 1
+        return np.asarray(canvas.buffer_rgba())
+
+    def savefig(self, fname, format=None, **data):
+        'render() the slot data in `data` and save it as an image to `fname`.'
+        imsave(fname, self._draw(**data), format=format, dpi=self.fig.dpi)
+
+    def to_bytes(self, format='png', **data):
+        'render() and encode as `format`, returning bytes.'
+        buf = io.BytesIO()
+        self.savefig(buf, format=format, **data)
+        return buf.getvalue()
+
+
+if __name__ == '__main__':
+    n = 200
+    rng = np.random.RandomState(0)
+    datasets = [rng.randn(2, 500) for i in range(n)]
+
+    def build(x, y):
+        fig = new_figure()
+        ax = fig.add_subplot(1, 1, 1)
+        ax.scatter(x, y)
+        ax.set_xlim(-2, 2)
+        ax.set_ylim(-4, 4)
+        ax.set_title('Gaussian Data')
+        return fig
+
+    def rebuild(x, y):
+        fig = build(x, y)
+        fig.canvas.draw()
+        return fig
+
+    def template():
+        fig = new_figure()
+        ax = fig.add_subplot(1, 1, 1)
+        points = ax.scatter([], [])
+        ax.set_xlim(-2, 2)
+        ax.set_ylim(-4, 4)
+        ax.set_title('Gaussian Data')
+        return FigureTemplate(fig, points=points)
+
+    # Both give the same picture (for data clear of the axes frame, which
+    # the template would draw the data over)
+    tmpl = template()
+    x, y = 0.5 * datasets[0]
+    same = np.array_equal(tmpl.render(points=(x, y)),
+        np.asarray(rebuild(x, y).canvas.buffer_rgba()))
+    print('template matches a rebuilt figure: %s' % same)
+
+    def time_it(func):
+        start = time.time()
+        for x, y in datasets:
+            func(x, y)
+        return 1000 * (time.time() - start) / n
+
+    def rebuild_png(x, y):
+        buf = io.BytesIO()
+        build(x, y).savefig(buf, format='png')
+
+    tmpl = template()
+    print('%-12s %12s %12s' % ('ms/figure', 'draw only', 'draw + PNG'))
+    print('%-12s %12.2f %12.2f' % ('rebuild', time_it(rebuild),
+        time_it(rebuild_png)))
+    print('%-12s %12.2f %12.2f' % ('template',
+        time_it(lambda x, y: tmpl.render(points=(x, y))),
+        time_it(lambda x, y: tmpl.to_bytes(points=(x, y)))))
+    print('template: %(renders)d renders, %(backgrounds)d background '
+        'draws' % tmpl.stats)
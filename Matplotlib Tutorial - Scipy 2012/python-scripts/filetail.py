@@ -0,0 +1,191 @@
+# Plotting data from a file as it is written, e.g. an instrument log.
+#
+# As the Animation Classes section of Animations_tutorial.py points out, a
+# timer can be used to check a file and update the plot with any new data.
+# The tail classes here remember how far into the file they have read, so
+# each check only reads and parses the bytes appended since the last one.
+# LiveTailPlot polls one on the canvas timer and appends the new rows to a
+# line's data. If the file is truncated or replaced (e.g. by log rotation)
+# the tail starts reading it again from the beginning, counting this in its
+# `restarts`, and LiveTailPlot then starts the line over too.
+
+import io
+import os
+
+import numpy as np
+
+from pointbuffer import PointBuffer
+
+
+class _Tail(object):
+    # Common handling of the file offset. Subclasses parse the bytes.
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.restarts = 0
+        self._partial = b''
+
+    def _restart(self):
+        # Go back to the start of the file, forgetting anything read so far
+        self.offset = 0
+        self._partial = b''
+        self.restarts += 1
+
+    def _read_new(self):
+        try:
+            size = os.stat(self.path).st_size
+        except OSError:
+            return b''
+
+        if size < self.offset:
+            # The file was truncated or replaced, start over
+            self._restart()
+        if size == self.offset:
+            return b''
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        self.offset += len(data)
+        return data
+
+
+class CSVTail(_Tail):
+    '''
+    Incrementally read rows of numbers from a delimited text file.
+
+    read() returns a (rows, columns) array of the complete lines added since
+    the last call, keeping any partly written line for next time. `usecols`
+    and `delimiter` are as for np.loadtxt, and the first `skiprows` lines of
+    the file are ignored (e.g. a header).
+    '''
+    def __init__(self, path, usecols=None, delimiter=',', skiprows=0):
+        _Tail.__init__(self, path)
+        self.usecols = usecols
+        self.delimiter = delimiter
+        self.skiprows = skiprows
+        self._skipped = 0
+
+    def _restart(self):
+        _Tail._restart(self)
+        self._skipped = 0
+
+    def read(self):
+        # Read first: it can start the file over, dropping _partial
+        new = self._read_new()
+        data = self._partial + new
+        end = data.rfind(b'\n') + 1
+        self._partial = data[end:]
+        data = data[:end]
+
+        while self._skipped < self.skiprows and data:
+            data = data[data.find(b'\n') + 1:]
+            self._skipped += 1
+
+        if not data.strip():
+            return np.empty((0, 0))
+        return np.loadtxt(io.BytesIO(data), delimiter=self.delimiter,
+            usecols=self.usecols, ndmin=2)
+
+
+class BinaryTail(_Tail):
+    '''
+    Incrementally read fixed size records from a binary file.
+
+    `dtype` describes one record, e.g. np.dtype((np.float64, 2)) for pairs
+    of doubles. read() returns the array of complete records added since the
+    last call.
+    '''
+    def __init__(self, path, dtype):
+        _Tail.__init__(self, path)
+        self.dtype = np.dtype(dtype)
+
+    def read(self):
+        new = self._read_new()
+        data = self._partial + new
+        end = len(data) - len(data) % self.dtype.itemsize
+        self._partial = data[end:]
+        return np.frombuffer(data[:end], dtype=self.dtype)
+
+
+class LiveTailPlot(object):
+    '''
+    Poll `source` (a CSVTail or BinaryTail) every `interval` milliseconds
+    and append any new rows to `line`.
+
+    Column `xcol` of each row is used for x and `ycol` for y. Only every
+    `decimate`-th row is kept, counting across reads, which keeps huge files
+    quick to draw. With `maxlen`, only the newest maxlen points are shown.
+    With autoscale=True the axes limits are grown to fit the new points
+    only, so there is no need to look at all of the old data again.
+    '''
+    def __init__(self, line, source, interval=500, xcol=0, ycol=1,
+            decimate=1, maxlen=None, autoscale=True):
+        self.line = line
+        self.source = source
+        self.xcol = xcol
+        self.ycol = ycol
+        self.decimate = decimate
+        self.autoscale = autoscale
+        self.points = PointBuffer(maxlen=maxlen)
+        self.rows = 0
+        self._restarts = source.restarts
+
+        canvas = line.figure.canvas
+        self._timer = canvas.new_timer(interval=interval)
+        self._timer.add_callback(self._on_timer)
+        self._timer.interval = interval # Work around bug in QT timer
+        canvas.mpl_connect('close_event', lambda *a: self.stop())
+
+    def start(self):
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    def _on_timer(self):
+        # Returning 0 from a timer callback removes it, so ignore the count
+        self.update()
+
+    def update(self):
+        'Read any new data and add it to the line. Returns the points added.'
+        new = self.source.read()
+        restarted = self.source.restarts != self._restarts
+        if restarted:
+            # A new file: drop the old one's points and count rows afresh
+            self._restarts = self.source.restarts
+            self.points.clear()
+            self.rows = 0
+            self.line.set_data(self.points.x, self.points.y)
+            self.line.figure.canvas.draw_idle()
+        if not len(new):
+            return 0
+
+        if new.dtype.names:
+            x = new[new.dtype.names[self.xcol]]
+            y = new[new.dtype.names[self.ycol]]
+        else:
+            x = new[:, self.xcol]
+            y = new[:, self.ycol]
+
+        # Keep every decimate-th row of the whole file, wherever the reads
+        # happen to split it
+        first = (-self.rows) % self.decimate
+        self.rows += len(x)
+        x = x[first::self.decimate]
+        y = y[first::self.decimate]
+        if not len(x):
+            return 0
+
+        self.points.extend(x, y)
+        self.line.set_data(self.points.x, self.points.y)
+        if self.autoscale:
+            ax = self.line.axes
+            if restarted:
+                # The limits have to shrink too, so start them over
+                ax.relim()
+            else:
+                ax.update_datalim(np.column_stack([x, y]))
+            ax.autoscale_view()
+        self.line.figure.canvas.draw_idle()
+        return len(x)
@@ -0,0 +1,223 @@
+# Working out ticks once per grid instead of once per axes.
+#
+# Every axes of a subplots() grid locates and formats its own ticks on each
+# draw (and on each tight_layout()), one tick at a time in Python. With
+# sharex/sharey the panels in a row or column even share the same locator
+# and formatter, and still repeat exactly the same work for every one of
+# them. share_ticks() wraps the locators and formatters of a grid so that
+# they look their results up in one shared cache, keyed by the view limits
+# (plus the space available for ticks and the locator/formatter settings).
+# Identical axes are then only worked out once, and a grid whose limits
+# don't change between draws isn't worked out again at all. New labels are
+# formatted with a single numpy call for all of an axis' ticks rather than
+# a Python call per tick.
+#
+# ax.locator_params() and ax.ticklabel_format() keep working as before.
+
+import time
+
+import numpy as np
+import matplotlib as mpl
+from matplotlib.ticker import Locator, ScalarFormatter
+
+
+def _config(obj):
+    # Settings of a locator as something hashable
+    return repr(sorted((k, v) for k, v in vars(obj).items() if k != 'axis'))
+
+
+class TickCache(object):
+    '''
+    Shared memo of tick locations and labels, counting hits and misses.
+    '''
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._store = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._store)
+
+    def get(self, key):
+        try:
+            value = self._store[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if len(self._store) >= self.maxsize:
+            self._store.clear()
+        self._store[key] = value
+
+    def clear(self):
+        self._store.clear()
+
+
+class CachedLocator(Locator):
+    '''
+    Locator giving the same ticks as `base`, memoized in `cache` (a
+    TickCache) by view limits.
+    '''
+    def __init__(self, base, cache):
+        self.base = base
+        self.cache = cache
+        # Locators are only changed through set_params(), so their settings
+        # only need turning into a key then
+        self._key = (type(base).__name__, _config(base))
+
+    def set_axis(self, axis):
+        Locator.set_axis(self, axis)
+        self.base.set_axis(axis)
+
+    def set_params(self, **kwargs):
+        self.base.set_params(**kwargs)
+        self._key = (type(self.base).__name__, _config(self.base))
+
+    def nonsingular(self, v0, v1):
+        return self.base.nonsingular(v0, v1)
+
+    def view_limits(self, vmin, vmax):
+        return self.base.view_limits(vmin, vmax)
+
+    def __call__(self):
+        vmin, vmax = self.axis.get_view_interval()
+        return self.tick_values(vmin, vmax)
+
+    def tick_values(self, vmin, vmax):
+        # With nbins='auto' the ticks also depend on the length of the axis
+        space = None
+        if getattr(self.base, '_nbins', None) == 'auto':
+            space = self.axis.get_tick_space()
+        key = ('locs', vmin, vmax, space, self._key)
+        locs = self.cache.get(key)
+        if locs is None:
+            locs = self.base.tick_values(vmin, vmax)
+            self.cache.put(key, locs)
+        return locs
+
+
+class CachedScalarFormatter(ScalarFormatter):
+    '''
+    ScalarFormatter that formats all of the ticks in one go, memoized in
+    `cache` (a TickCache) by tick values and view limits. Other arguments
+    are as for ScalarFormatter.
+    '''
+    def __init__(self, cache, *args, **kwargs):
+        ScalarFormatter.__init__(self, *args, **kwargs)
+        self.cache = cache
+
+    def format_ticks(self, values):
+        vmin, vmax = self.axis.get_view_interval()
+        # A fixed offset (useOffset=<number>) shows up as _useOffset False
+        key = ('labels', tuple(values), vmin, vmax,
+            mpl.rcParams['axes.unicode_minus'], self._scientific,
+            tuple(self._powerlimits), self._useOffset,
+            self._useOffset or self.offset, self._offset_threshold,
+            self._useMathText, self._useLocale, self._usetex)
+        cached = self.cache.get(key)
+        if cached is None:
+            self.set_locs(values)
+            labels = self._format_all(values)
+            # Keep the offset etc. too, since get_offset() needs them
+            state = dict((k, v) for k, v in vars(self).items()
+                if k not in ('axis', 'cache'))
+            self.cache.put(key, (labels, state))
+        else:
+            labels, state = cached
+            self.__dict__.update(state)
+        return list(labels)
+
+    def _format_all(self, values):
+        if not len(values):
+            return []
+        if self._useLocale:
+            return [self(value, i) for i, value in enumerate(values)]
+        xp = (np.asarray(values, dtype=np.float64) - self.offset) / (
+            10. ** self._orderOfMagnitude)
+        xp[np.abs(xp) < 1e-8] = 0
+        labels = np.char.mod(self._format, xp)
+        if mpl.rcParams['axes.unicode_minus']:
+            labels = np.char.replace(labels, '-', '\N{MINUS SIGN}')
+        return labels.tolist()
+
+
+def share_ticks(axes, cache=None):
+    '''
+    Make all of `axes` (e.g. the array from plt.subplots()) locate and
+    format their major ticks through one shared TickCache, which is
+    returned. Scalar formatters are replaced by CachedScalarFormatters with
+    the same settings; other formatters are left alone.
+    '''
+    if cache is None:
+        cache = TickCache()
+    for ax in np.ravel(axes):
+        for axis in (ax.xaxis, ax.yaxis):
+            locator = axis.get_major_locator()
+            if not isinstance(locator, CachedLocator):
+                axis.set_major_locator(CachedLocator(locator, cache))
+            formatter = axis.get_major_formatter()
+            if (isinstance(formatter, ScalarFormatter) and
+                    not isinstance(formatter, CachedScalarFormatter)):
+                new = CachedScalarFormatter(cache)
+                new.__dict__.update(dict((k, v) for k, v in
+                    vars(formatter).items() if k != 'axis'))
+                axis.set_major_formatter(new)
+    return cache
+
+
+if __name__ == '__main__':
+    mpl.use('Agg')
+    import matplotlib.pyplot as plt
+
+    x = np.linspace(0, 1, 200)
+    repeat = 20
+
+    def make_grid(n):
+        fig, axes = plt.subplots(n, n, sharex=True, sharey=True,
+            figsize=(2 * n, 2 * n))
+        for ax in axes.flat:
+            ax.plot(1000 * x, 1000 * np.random.randn(len(x)))
+            ax.locator_params(nbins=4)
+            ax.ticklabel_format(scilimits=(-1, 1))
+        axes[0, 0].set_ylim(-5000, 5000)
+        return fig, axes
+
+    def tick_time(fig):
+        # Time just the tick updates that a draw does for every axis
+        fig.canvas.draw()
+        start = time.time()
+        for i in range(repeat):
+            for ax in fig.axes:
+                ax.xaxis._update_ticks()
+                ax.yaxis._update_ticks()
+        return (time.time() - start) / repeat
+
+    def draw_time(fig):
+        start = time.time()
+        for i in range(repeat):
+            fig.canvas.draw()
+        return (time.time() - start) / repeat
+
+    print('%6s %22s %22s' % ('grid', 'tick updates (ms)', 'draw (ms)'))
+    print('%6s %11s %10s %11s %10s' % ('', 'plain', 'cached', 'plain',
+        'cached'))
+    for n in (3, 6, 10):
+        fig, axes = make_grid(n)
+        plain = tick_time(fig), draw_time(fig)
+        labels = [t.get_text() for t in axes[0, 0].get_yticklabels()]
+        offset = axes[0, 0].yaxis.get_offset_text().get_text()
+
+        cache = share_ticks(axes)
+        cached = tick_time(fig), draw_time(fig)
+        assert labels == [t.get_text() for t in axes[0, 0].get_yticklabels()]
+        assert offset == axes[0, 0].yaxis.get_offset_text().get_text()
+        print('%6s %11.2f %10.2f %11.2f %10.2f' % ('%dx%d' % (n, n),
+            1000 * plain[0], 1000 * cached[0], 1000 * plain[1],
+            1000 * cached[1]))
+        print('%6s cache: %d hits, %d misses' % ('', cache.hits,
+            cache.misses))
+        plt.close(fig)
@@ -0,0 +1,141 @@
+# An animation of a sequence of images that draws every frame with a single
+# image artist.
+#
+# The ArtistAnimation examples in Animations_tutorial.py call imshow() once
+# per frame, creating a new AxesImage for each and keeping all of them (and
+# their data) around. ImageSequenceAnimation instead makes one AxesImage and
+# calls set_data() on it with each frame as it is needed. Frames are only
+# read when they are shown, so they can come from an array, a memory-mapped
+# file (np.load(..., mmap_mode='r') or np.memmap) or a generator without
+# ever holding more than one in memory.
+
+import itertools
+
+import numpy as np
+from matplotlib.animation import TimedAnimation
+from matplotlib.artist import Artist
+from matplotlib.image import AxesImage
+
+
+class ImageSequenceAnimation(TimedAnimation):
+    '''
+    Animate a sequence of 2D arrays (or RGB(A) images) using one image.
+
+    `frames` can be:
+
+    * An array-like indexed along its first axis, such as a (T, M, N) array
+      or memory map. Frames are indexed lazily, one per draw.
+    * A callable returning an iterable of frames. It is called again each
+      time the animation repeats.
+    * An iterable (e.g. a generator) of frames. It can only be played once.
+    * A list of lists of artists, as taken by ArtistAnimation. The data is
+      pulled out of the image in each list and those images are removed from
+      the axes; any other artists are shown only on their frame.
+
+    If `image` is not given, one is created on `ax` (default: the current
+    axes of `fig`) by calling imshow with the first frame and `imshow_kw`.
+    With autoscale=True the color limits are reset to each new frame's data.
+    Other keyword arguments go to TimedAnimation (interval, repeat, blit...).
+    '''
+    def __init__(self, fig, frames, ax=None, image=None, imshow_kw=None,
+            autoscale=False, **kwargs):
+        self._autoscale = autoscale
+        self._extra = None
+        self._drawn_artists = []
+
+        if isinstance(frames, (list, tuple)) and frames and isinstance(
+                frames[0], (list, tuple)) and isinstance(frames[0][0], Artist):
+            frames, self._extra = self._from_artist_lists(frames)
+
+        if callable(frames):
+            self._make_iter = frames
+            self._indexed = None
+        elif hasattr(frames, '__getitem__') and hasattr(frames, '__len__'):
+            self._make_iter = None
+            self._indexed = frames
+        else:
+            # A one shot iterable. Keep hold of the first frame since we
+            # may need it to create the image.
+            it = iter(frames)
+            first = next(it)
+            frames = itertools.chain([first], it)
+            self._make_iter = None
+            self._indexed = None
+        self._framedata = frames
+
+        if image is None:
+            if ax is None:
+                ax = fig.gca()
+            image = ax.imshow(self._first_frame(), **(imshow_kw or {}))
+        self.image = image
+
+        super(ImageSequenceAnimation, self).__init__(fig, **kwargs)
+
+    def _from_artist_lists(self, artist_lists):
+        # Swap the per-frame images for their data. Anything else in a frame
+        # is kept to be toggled like ArtistAnimation does.
+        data = []
+        extra = []
+        for artists in artist_lists:
+            images = [a for a in artists if isinstance(a, AxesImage)]
+            if not images:
+                raise ValueError('Each frame needs an image to take data from')
+            data.append(images[0].get_array())
+            for im in images:
+                im.remove()
+            extra.append([a for a in artists if a not in images])
+        if not any(extra):
+            extra = None
+        return data, extra
+
+    def _first_frame(self):
+        if self._make_iter is not None:
+            return next(iter(self._make_iter()))
+        elif self._indexed is not None:
+            return self._indexed[0]
+        else:
+            first = next(self._framedata)
+            self._framedata = itertools.chain([first], self._framedata)
+            return first
+
+    def new_frame_seq(self):
+        if self._make_iter is not None:
+            return iter(self._make_iter())
+        elif self._indexed is not None:
+            return iter(range(len(self._indexed)))
+        else:
+            return self._framedata
+
+    def _init_draw(self):
+        super(ImageSequenceAnimation, self)._init_draw()
+        self.image.set_animated(self._blit)
+        if self._extra is not None:
+            for artist in itertools.chain(*self._extra):
+                artist.set_visible(False)
+                artist.set_animated(self._blit)
+        self._drawn_artists = [self.image]
+
+    def _pre_draw(self, framedata, blit):
+        if blit:
+            self._blit_clear(self._drawn_artists)
+        elif self._extra is not None:
+            for artist in self._drawn_artists[1:]:
+                artist.set_visible(False)
+
+    def _draw_frame(self, framedata):
+        if self._indexed is not None:
+            index = framedata
+            data = np.asarray(self._indexed[index])
+        else:
+            index = None
+            data = framedata
+
+        self.image.set_data(data)
+        if self._autoscale:
+            self.image.autoscale()
+
+        self._drawn_artists = [self.image]
+        if self._extra is not None and index is not None:
+            for artist in self._extra[index]:
+                artist.set_visible(True)
+            self._drawn_artists.extend(self._extra[index])
@@ -0,0 +1,236 @@
+# Rendering a figure with many axes, like a big plt.subplots() grid, using
+# several processes.
+#
+# Agg draws the axes of a figure one after another on a single core (and
+# holds the GIL while doing so, which rules out threads). Here the figure is
+# split into layers in drawing order: the figure background, each Axes on
+# its own (including ImageGrid and colorbar axes) and any figure level
+# artists (suptitle, legends...) in between. Each worker in a pool gets a
+# copy of the figure, draws one layer at a time on a transparent Agg canvas
+# with everything else hidden, and sends back just the part of the canvas
+# that was drawn on. The parent stacks the pieces back up, in order, with
+# alpha blending, which gives the same picture as drawing the whole figure
+# (up to rounding where layers overlap).
+#
+# A layout engine (layout='constrained' or 'tight') would place the axes
+# again for every layer, with all of the other axes hidden, so the layout
+# is worked out once for the whole figure beforehand and the engine is
+# switched off while the layers are drawn.
+#
+# There is a fixed cost for starting the pool and copying the figure to it,
+# so this only pays off for large grids on machines with several cores.
+
+import multiprocessing
+import time
+
+import numpy as np
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+def layers(fig):
+    '''
+    The visible children of `fig` grouped into layers in the order they are
+    drawn: one per Axes, with runs of other artists grouped together. Each
+    layer is a list of indices into fig.get_children().
+    '''
+    children = fig.get_children()
+    # The figure patch always comes first, then everything by zorder
+    order = sorted(range(1, len(children)),
+        key=lambda i: children[i].get_zorder())
+    groups = [[0]]
+    for i in order:
+        child = children[i]
+        if not child.get_visible():
+            continue
+        if isinstance(child, Axes):
+            groups.append([i])
+            groups.append([])
+        else:
+            groups[-1].append(i)
+    return [g for g in groups if g]
+
+
+def render_layer(fig, layer):
+    '''
+    Draw only the children of `fig` in `layer` (see layers()) on a
+    transparent Agg canvas. Returns (row, column, rgba) for the part of the
+    canvas that was drawn on, or None if nothing was.
+
+    The figure shouldn't have a layout engine while this is used (see
+    render_parallel()), or each layer is laid out on its own.
+    '''
+    if not isinstance(fig.canvas, FigureCanvasAgg):
+        FigureCanvasAgg(fig)
+    children = fig.get_children()
+    visible = [c.get_visible() for c in children]
+    keep = set(layer)
+    try:
+        for i, child in enumerate(children):
+            child.set_visible(visible[i] and i in keep)
+        fig.canvas.draw()
+    finally:
+        for child, vis in zip(children, visible):
+            child.set_visible(vis)
+
+    rgba = np.asarray(fig.canvas.buffer_rgba())
+    alpha = rgba[..., 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if not len(rows):
+        return None
+    cols = np.flatnonzero(alpha.any(axis=0))
+    r0, r1 = rows[0], rows[-1] + 1
+    c0, c1 = cols[0], cols[-1] + 1
+    return r0, c0, rgba[r0:r1, c0:c1].copy()
+
+
+def composite(shape, pieces):
+    '''
+    Blend the (row, column, rgba) `pieces`, in order, onto a transparent
+    canvas of the given (height, width) and return it as uint8 RGBA.
+    '''
+    out = np.zeros(tuple(shape) + (4,), dtype=np.float32)
+    for piece in pieces:
+        if piece is None:
+            continue
+        r0, c0, rgba = piece
+        h, w = rgba.shape[:2]
+        dst = out[r0:r0 + h, c0:c0 + w]
+        src = rgba.astype(np.float32) / 255.
+        sa = src[..., 3:]
+        da = dst[..., 3:] * (1 - sa)
+        alpha = sa + da
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rgb = (src[..., :3] * sa + dst[..., :3] * da) / alpha
+        dst[..., :3] = np.where(alpha > 0, rgb, 0)
+        dst[..., 3:] = alpha
+    return (out * 255 + 0.5).astype(np.uint8)
+
+
+_worker = {}
+
+
+def _init_worker(fig):
+    _worker['fig'] = fig
+    FigureCanvasAgg(fig)
+    _worker['layers'] = layers(fig)
+
+
+def _render(index):
+    start = time.time()
+    piece = render_layer(_worker['fig'], _worker['layers'][index])
+    return index, piece, time.time() - start
+
+
+def render_parallel(fig, processes=None, stats=None):
+    '''
+    Draw `fig` with its layers split over a pool of `processes` workers and
+    return the result as an (height, width, 4) uint8 RGBA array.
+
+    If given, the dictionary `stats` is filled in with the number of
+    layers, the time spent drawing summed over the workers ('render') and
+    the total elapsed time ('wall').
+    '''
+    start = time.time()
+    width, height = fig.canvas.get_width_height()
+    groups = layers(fig)
+    pieces = [None] * len(groups)
+    render = 0.0
+
+    engine = fig.get_layout_engine()
+    if engine is not None:
+        # Lay out the whole figure now, as drawing it would, and keep that
+        # layout for all of the layers
+        engine.execute(fig)
+        fig.set_layout_engine('none')
+    try:
+        if processes == 1:
+            for index, layer in enumerate(groups):
+                t0 = time.time()
+                pieces[index] = render_layer(fig, layer)
+                render += time.time() - t0
+        else:
+            # With fork the figure is simply inherited by the workers; other
+            # start methods pickle it
+            pool = multiprocessing.Pool(processes, _init_worker, (fig,))
+            try:
+                for index, piece, elapsed in pool.imap_unordered(_render,
+                        range(len(groups))):
+                    pieces[index] = piece
+                    render += elapsed
+            finally:
+                pool.close()
+                pool.join()
+    finally:
+        if engine is not None:
+            fig.set_layout_engine(engine)
+
+    image = composite((height, width), pieces)
+    if stats is not None:
+        stats.update(layers=len(groups), render=render,
+            wall=time.time() - start)
+    return image
+
+
+def savefig_parallel(fig, fname, processes=None, **kwargs):
+    '''
+    Save `fig` as a PNG, rendered with render_parallel(). Other keyword
+    arguments are passed to matplotlib.image.imsave().
+    '''
+    from matplotlib.image import imsave
+    imsave(fname, render_parallel(fig, processes), dpi=fig.dpi, **kwargs)
+
+
+if __name__ == '__main__':
+    import io
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    x = np.linspace(0, 2 * np.pi, 20000)
+
+    # Same picture as drawing the figure as usual, with or without a layout
+    # engine. (tight_layout moves things slightly the second time it runs,
+    # so the figure is drawn once first.)
+    for layout in (None, 'constrained', 'tight'):
+        for processes in (1, None):
+            fig, axes = plt.subplots(3, 3, figsize=(6, 6), layout=layout)
+            for i, ax in enumerate(axes.flat):
+                ax.plot(1000 * x, 1000 * np.sin((i + 1) * x))
+                ax.set_title('Panel %d' % i)
+            fig.suptitle('layout=%r' % layout)
+            fig.canvas.draw()
+            image = render_parallel(fig, processes).astype(int)
+            fig.canvas.draw()
+            expected = np.asarray(fig.canvas.buffer_rgba()).astype(int)
+            off = (np.abs(image - expected).max(axis=-1) > 2).sum()
+            print('layout=%-13r processes=%-4s pixels more than 2/255 off: '
+                '%d' % (layout, processes, off))
+            plt.close(fig)
+
+    print('%d cores' % multiprocessing.cpu_count())
+    print('%6s %12s %12s %12s' % ('grid', 'savefig (s)', 'serial (s)',
+        'parallel (s)'))
+    for n in (3, 6, 10):
+        fig, axes = plt.subplots(n, n, figsize=(2 * n, 2 * n), sharex=True)
+        for i, ax in enumerate(axes.flat):
+            ax.plot(1000 * x, 1000 * np.sin((i + 1) * x) * np.cos(7 * x))
+            ax.locator_params(nbins=4)
+        fig.tight_layout()
+
+        start = time.time()
+        fig.savefig(io.BytesIO(), format='png')
+        plain = time.time() - start
+
+        start = time.time()
+        savefig_parallel(fig, io.BytesIO(), processes=1)
+        serial = time.time() - start
+
+        start = time.time()
+        savefig_parallel(fig, io.BytesIO())
+        parallel = time.time() - start
+
+        print('%6s %12.3f %12.3f %12.3f' % ('%dx%d' % (n, n), plain, serial,
+            parallel))
+        plt.close(fig)
@@ -0,0 +1,189 @@
+# Saving an animation to a movie with the frames rendered in parallel.
+#
+# anim.save() draws each frame in turn on one core and pipes it to the
+# encoder. Here each worker process in a pool builds its own copy of the
+# figure on an Agg canvas from a picklable FrameSpec, draws whichever frames
+# it is handed and sends back the raw RGBA buffer. The parent puts the
+# buffers back in order and streams them to the encoder, keeping track of
+# how long is spent rendering versus encoding.
+
+import multiprocessing
+import subprocess
+import time
+
+import numpy as np
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+class FrameSpec(object):
+    '''
+    Picklable description of an animation, in the same terms as
+    FuncAnimation.
+
+    `setup(fig)` is called once per worker with a fresh Figure and should
+    create the artists, returning a tuple of extra arguments. For every
+    frame, `update(framedata, *args)` is then called with one item from
+    `frames` and those arguments. Both must be module level functions so
+    that they can be pickled, and setup() must build the same figure every
+    time it is called (e.g. no unseeded random data) since each worker
+    calls it separately. `fig_kw` is passed on to Figure (e.g. figsize and
+    dpi).
+    '''
+    def __init__(self, setup, update, frames, fig_kw=None):
+        self.setup = setup
+        self.update = update
+        self.frames = list(frames)
+        self.fig_kw = fig_kw or {}
+
+    def __len__(self):
+        return len(self.frames)
+
+    def build(self):
+        fig = Figure(**self.fig_kw)
+        FigureCanvasAgg(fig)
+        args = self.setup(fig)
+        if args is None:
+            args = ()
+        return fig, args
+
+    def render(self, fig, args, index):
+        self.update(self.frames[index], *args)
+        fig.canvas.draw()
+        return fig.canvas.get_width_height(), bytes(fig.canvas.buffer_rgba())
+
+
+class FFMpegPipe(object):
+    'Encode raw RGBA frames by piping them to ffmpeg.'
+    def __init__(self, path, size, fps, codec='h264', extra_args=None):
+        cmd = [matplotlib.rcParams['animation.ffmpeg_path'], '-y',
+            '-f', 'rawvideo', '-vcodec', 'rawvideo', '-s', '%dx%d' % size,
+            '-pix_fmt', 'rgba', '-r', str(fps), '-i', 'pipe:',
+            '-vcodec', codec, '-pix_fmt', 'yuv420p']
+        cmd.extend(extra_args or [])
+        cmd.append(path)
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def write(self, buf):
+        self._proc.stdin.write(buf)
+
+    def close(self):
+        self._proc.stdin.close()
+        if self._proc.wait():
+            raise RuntimeError('ffmpeg exited with status %d' %
+                self._proc.returncode)
+
+
+# Per-process state for the pool workers
+_worker = {}
+
+
+def _init_worker(spec):
+    _worker['spec'] = spec
+    _worker['fig'], _worker['args'] = spec.build()
+
+
+def _render(index):
+    start = time.time()
+    size, buf = _worker['spec'].render(_worker['fig'], _worker['args'], index)
+    return index, size, buf, time.time() - start
+
+
+def save_parallel(path, spec, fps=15, processes=None, sink=None, **kwargs):
+    '''
+    Render the frames of the FrameSpec `spec` on a pool of `processes`
+    workers and encode them to `path`.
+
+    By default the frames are piped to ffmpeg (extra keyword arguments go
+    to FFMpegPipe). Passing `sink`, a callable taking (path, size, fps) and
+    returning an object with write(buf) and close() methods, sends the
+    frames somewhere else instead.
+
+    Returns a dictionary of timings in seconds: 'render' is the time spent
+    drawing summed over the workers, 'encode' the time the parent spent
+    handing frames to the encoder (including waiting on the pipe) and
+    'wall' the total elapsed time.
+    '''
+    if sink is None:
+        sink = lambda path, size, fps: FFMpegPipe(path, size, fps, **kwargs)
+
+    stats = dict(frames=len(spec), render=0.0, encode=0.0)
+    start = time.time()
+    writer = None
+    pending = {}
+    next_index = 0
+
+    pool = multiprocessing.Pool(processes, _init_worker, (spec,))
+    try:
+        for index, size, buf, elapsed in pool.imap_unordered(_render,
+                range(len(spec))):
+            stats['render'] += elapsed
+            pending[index] = buf
+
+            # Hand over as many frames as we now have in order
+            while next_index in pending:
+                if writer is None:
+                    writer = sink(path, size, fps)
+                enc_start = time.time()
+                writer.write(pending.pop(next_index))
+                stats['encode'] += time.time() - enc_start
+                next_index += 1
+    finally:
+        pool.close()
+        pool.join()
+        if writer is not None:
+            enc_start = time.time()
+            writer.close()
+            stats['encode'] += time.time() - enc_start
+
+    stats['wall'] = time.time() - start
+    return stats
+
+
+def save_serial(path, spec, fps=15, sink=None, **kwargs):
+    'Same as save_parallel(), but drawing every frame in this process.'
+    if sink is None:
+        sink = lambda path, size, fps: FFMpegPipe(path, size, fps, **kwargs)
+
+    stats = dict(frames=len(spec), render=0.0, encode=0.0)
+    start = time.time()
+    fig, args = spec.build()
+    writer = None
+    for index in range(len(spec)):
+        render_start = time.time()
+        size, buf = spec.render(fig, args, index)
+        stats['render'] += time.time() - render_start
+        if writer is None:
+            writer = sink(path, size, fps)
+        enc_start = time.time()
+        writer.write(buf)
+        stats['encode'] += time.time() - enc_start
+    if writer is not None:
+        enc_start = time.time()
+        writer.close()
+        stats['encode'] += time.time() - enc_start
+    stats['wall'] = time.time() - start
+    return stats
+
+
+# The random image animation from the "Saving to file" section. The color
+# limits are fixed so that every worker's image is scaled the same way.
+def _setup_images(fig):
+    ax = fig.add_subplot(1, 1, 1)
+    im = ax.imshow(np.zeros((20, 20)), vmin=-3, vmax=3)
+    return im,
+
+
+def _update_images(seed, im):
+    im.set_data(np.random.RandomState(seed).randn(20, 20))
+
+
+if __name__ == '__main__':
+    spec = FrameSpec(_setup_images, _update_images, range(50))
+    for name, func in [('serial', save_serial), ('parallel', save_parallel)]:
+        stats = func('images.mp4', spec, fps=15)
+        print('%-8s %3d frames: render %.2f s, encode %.2f s, wall %.2f s' % (
+            name, stats['frames'], stats['render'], stats['encode'],
+            stats['wall']))
@@ -0,0 +1,157 @@
+# An on-disk cache of double pendulum trajectories.
+#
+# The double pendulum demo integrates the equations and projects them to
+# x1, y1, x2, y2 every time it runs, even if nothing has changed. Here each
+# run is stored as a single .npy file named after a hash of everything that
+# determines it: the initial state, dt, duration, the G/L1/L2/M1/M2
+# physics and the integrator settings (the odeint keyword arguments).
+# Loading it back uses a memory map, so a replay or re-export starts
+# straight away and several processes playing the same trajectory share the
+# same pages. The least recently used files are removed once the cache
+# grows past its size limit. The double pendulum cell of the tutorial gets
+# its trajectory from here.
+
+import hashlib
+import os
+import tempfile
+import time
+
+import numpy as np
+import scipy.integrate as integrate
+
+from pendulum import G, L1, L2, M1, M2, BatchDerivs, cartesian
+
+# Columns of the cached arrays
+COLUMNS = ('th1', 'w1', 'th2', 'w2', 'x1', 'y1', 'x2', 'y2')
+
+
+class TrajectoryCache(object):
+    '''
+    Cache of trajectories in the directory `path`, holding at most
+    `max_bytes` of data.
+
+    get() returns a read-only (T, 8) memory-mapped array whose columns are
+    given by COLUMNS, computing and storing it first if needed.
+    '''
+    def __init__(self, path=None, max_bytes=1 << 30):
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.cache',
+                'double_pendulum')
+        self.path = path
+        self.max_bytes = max_bytes
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def key(self, state, dt, duration, g=G, l1=L1, l2=L2, m1=M1, m2=M2,
+            **odeint_kwargs):
+        # repr() gives the shortest string that round-trips each float, so
+        # equal inputs always give the same key
+        params = [float(v) for v in state] + [dt, duration, g, l1, l2, m1, m2]
+        text = ','.join(repr(float(v)) for v in params)
+        # Tolerances etc. change the answer too, as would another integrator
+        options = sorted((name, np.asarray(value).tolist())
+            for name, value in odeint_kwargs.items())
+        text += ';odeint;' + repr(options)
+        return hashlib.sha1(text.encode('ascii')).hexdigest()
+
+    def filename(self, key):
+        return os.path.join(self.path, key + '.npy')
+
+    def get(self, state, dt=0.05, duration=20., g=G, l1=L1, l2=L2, m1=M1,
+            m2=M2, **odeint_kwargs):
+        '''
+        Trajectory for initial `state` (radians) sampled every `dt` seconds
+        from 0 to `duration`, like np.arange(0.0, duration, dt) in the demo.
+        '''
+        fname = self.filename(self.key(state, dt, duration, g, l1, l2, m1,
+            m2, **odeint_kwargs))
+        try:
+            data = np.load(fname, mmap_mode='r')
+        except (IOError, ValueError):
+            data = None
+
+        if data is None:
+            t = np.arange(0.0, duration, dt)
+            derivs = BatchDerivs(1, g, l1, l2, m1, m2)
+            y = integrate.odeint(derivs, np.asarray(state, dtype=np.float64),
+                t, **odeint_kwargs)
+            out = np.empty((len(t), len(COLUMNS)))
+            out[:, :4] = y
+            for i, col in enumerate(cartesian(y, l1, l2)):
+                out[:, 4 + i] = col
+            self._store(fname, out)
+            self.evict()
+            data = np.load(fname, mmap_mode='r')
+        else:
+            # Mark as recently used
+            os.utime(fname, None)
+        return data
+
+    def _store(self, fname, data):
+        # Write to a temporary file and rename it into place, so that other
+        # processes never see a partly written file
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, data)
+        os.replace(tmp, fname)
+
+    def entries(self):
+        'List of (last used time, size, filename), oldest first.'
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.npy'):
+                continue
+            fname = os.path.join(self.path, name)
+            try:
+                st = os.stat(fname)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, fname))
+        entries.sort()
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        'Remove the least recently used files until under max_bytes.'
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        # Never remove the newest entry, even if it is over the limit alone
+        for _, size, fname in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(fname)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, fname in self.entries():
+            os.remove(fname)
+
+
+def trajectory(state, dt=0.05, duration=20., cache=None, **kwargs):
+    '''
+    Convenience wrapper returning t, y, x1, y1, x2, y2 for a run, where y is
+    the (T, 4) state and the rest are (T,) arrays, all views of the cached
+    data. Keyword arguments are passed on to TrajectoryCache.get().
+    '''
+    if cache is None:
+        cache = TrajectoryCache()
+    data = cache.get(state, dt, duration, **kwargs)
+    t = np.arange(0.0, duration, dt)
+    return (t, data[:, :4], data[:, 4], data[:, 5], data[:, 6], data[:, 7])
+
+
+if __name__ == '__main__':
+    from numpy import pi
+
+    cache = TrajectoryCache(tempfile.mkdtemp())
+    state = np.array([120.0, 0.0, -10.0, 0.0])*pi/180.
+
+    for label in ('cold', 'warm'):
+        start = time.time()
+        t, y, x1, y1, x2, y2 = trajectory(state, duration=200., cache=cache)
+        print('%s: %.4f s for %d steps' % (label, time.time() - start, len(t)))
@@ -0,0 +1,207 @@
+# Fixed step integrators for the double pendulum, as an alternative to
+# odeint.
+#
+# odeint picks its own (adaptive) steps, interpolates to get the output at
+# t = np.arange(0.0, 20, dt), and calls derivs() from Fortran for every
+# evaluation. For animation the output is needed on a fixed grid anyway, so
+# these step straight along that grid (optionally with several substeps
+# per frame), evaluating the equations with plain floats and writing each
+# state into a preallocated (T, 4) array.
+#
+# Two methods are available:
+#
+# * 'rk4': the classic fourth order Runge-Kutta method.
+# * 'midpoint': the implicit midpoint rule. This is only second order, but
+#   applied to the angles and their canonical momenta it is symplectic, so
+#   the energy error stays bounded instead of drifting over long runs. (The
+#   double pendulum's kinetic energy depends on the angles, so simpler
+#   explicit schemes like leapfrog are not symplectic for it.)
+
+import time
+from math import sin, cos
+
+import numpy as np
+import scipy.integrate as integrate
+
+from pendulum import G, L1, L2, M1, M2, derivs
+
+
+def _accel(th1, w1, th2, w2, g, l1, l2, m1, m2):
+    # Same equations as pendulum.derivs(), written for scalar floats
+    del_ = th2 - th1
+    s = sin(del_)
+    c = cos(del_)
+    den1 = (m1+m2)*l1 - m2*l1*c*c
+    a1 = (m2*l1*w1*w1*s*c + m2*g*sin(th2)*c + m2*l2*w2*w2*s
+          - (m1+m2)*g*sin(th1))/den1
+    den2 = (l2/l1)*den1
+    a2 = (-m2*l2*w2*w2*s*c + (m1+m2)*g*sin(th1)*c
+          - (m1+m2)*l1*w1*w1*s - (m1+m2)*g*sin(th2))/den2
+    return a1, a2
+
+
+def _rk4(out, h, substeps, g, l1, l2, m1, m2):
+    th1, w1, th2, w2 = out[0]
+    for i in range(1, len(out)):
+        for _ in range(substeps):
+            a1, b1 = _accel(th1, w1, th2, w2, g, l1, l2, m1, m2)
+            k1 = (w1, a1, w2, b1)
+            a2, b2 = _accel(th1 + 0.5*h*k1[0], w1 + 0.5*h*k1[1],
+                th2 + 0.5*h*k1[2], w2 + 0.5*h*k1[3], g, l1, l2, m1, m2)
+            k2 = (w1 + 0.5*h*k1[1], a2, w2 + 0.5*h*k1[3], b2)
+            a3, b3 = _accel(th1 + 0.5*h*k2[0], w1 + 0.5*h*k2[1],
+                th2 + 0.5*h*k2[2], w2 + 0.5*h*k2[3], g, l1, l2, m1, m2)
+            k3 = (w1 + 0.5*h*k2[1], a3, w2 + 0.5*h*k2[3], b3)
+            a4, b4 = _accel(th1 + h*k3[0], w1 + h*k3[1],
+                th2 + h*k3[2], w2 + h*k3[3], g, l1, l2, m1, m2)
+            k4 = (w1 + h*k3[1], a4, w2 + h*k3[3], b4)
+
+            th1 += h/6.*(k1[0] + 2*k2[0] + 2*k3[0] + k4[0])
+            w1 += h/6.*(k1[1] + 2*k2[1] + 2*k3[1] + k4[1])
+            th2 += h/6.*(k1[2] + 2*k2[2] + 2*k3[2] + k4[2])
+            w2 += h/6.*(k1[3] + 2*k2[3] + 2*k3[3] + k4[3])
+        row = out[i]
+        row[0] = th1
+        row[1] = w1
+        row[2] = th2
+        row[3] = w2
+
+
+def _momenta(th1, w1, th2, w2, l1, l2, m1, m2):
+    c = cos(th1 - th2)
+    p1 = (m1+m2)*l1*l1*w1 + m2*l1*l2*w2*c
+    p2 = m2*l2*l2*w2 + m2*l1*l2*w1*c
+    return p1, p2
+
+
+def _velocities(th1, p1, th2, p2, l1, l2, m1, m2):
+    # Invert the (angle dependent) mass matrix
+    a = (m1+m2)*l1*l1
+    d = m2*l2*l2
+    b = m2*l1*l2*cos(th1 - th2)
+    det = a*d - b*b
+    return (d*p1 - b*p2)/det, (a*p2 - b*p1)/det
+
+
+def _canonical(th1, p1, th2, p2, g, l1, l2, m1, m2):
+    # Hamilton's equations: d(theta)/dt from the momenta and
+    # dp/dt = dL/d(theta)
+    w1, w2 = _velocities(th1, p1, th2, p2, l1, l2, m1, m2)
+    k = m2*l1*l2*w1*w2*sin(th1 - th2)
+    return (w1, -k - (m1+m2)*g*l1*sin(th1), w2, k - m2*g*l2*sin(th2))
+
+
+def _midpoint(out, h, substeps, g, l1, l2, m1, m2, tol=1e-13, maxiter=50):
+    th1, w1, th2, w2 = out[0]
+    p1, p2 = _momenta(th1, w1, th2, w2, l1, l2, m1, m2)
+    for i in range(1, len(out)):
+        for _ in range(substeps):
+            # Solve z1 = z0 + h f((z0 + z1) / 2) by fixed point iteration,
+            # starting from an explicit Euler step
+            f = _canonical(th1, p1, th2, p2, g, l1, l2, m1, m2)
+            n1, n2, n3, n4 = (th1 + h*f[0], p1 + h*f[1], th2 + h*f[2],
+                p2 + h*f[3])
+            for _ in range(maxiter):
+                f = _canonical(0.5*(th1 + n1), 0.5*(p1 + n2),
+                    0.5*(th2 + n3), 0.5*(p2 + n4), g, l1, l2, m1, m2)
+                m1_, m2_, m3_, m4_ = (th1 + h*f[0], p1 + h*f[1],
+                    th2 + h*f[2], p2 + h*f[3])
+                err = max(abs(m1_ - n1), abs(m2_ - n2), abs(m3_ - n3),
+                    abs(m4_ - n4))
+                n1, n2, n3, n4 = m1_, m2_, m3_, m4_
+                if err < tol:
+                    break
+            th1, p1, th2, p2 = n1, n2, n3, n4
+        w1, w2 = _velocities(th1, p1, th2, p2, l1, l2, m1, m2)
+        row = out[i]
+        row[0] = th1
+        row[1] = w1
+        row[2] = th2
+        row[3] = w2
+
+
+_methods = dict(rk4=_rk4, midpoint=_midpoint)
+
+
+def integrate_fixed(state, t, method='rk4', substeps=1, out=None, g=G, l1=L1,
+        l2=L2, m1=M1, m2=M2):
+    '''
+    Integrate from initial `state` over the evenly spaced times `t`, taking
+    `substeps` steps of the chosen `method` ('rk4' or 'midpoint') between
+    each pair of times.
+
+    The result is written into `out`, a (T, 4) float array, which is
+    allocated if not given and returned. It has the same layout as the
+    result of odeint(derivs, state, t).
+    '''
+    t = np.asarray(t, dtype=np.float64)
+    if len(t) > 1:
+        dt = t[1] - t[0]
+        if not np.allclose(np.diff(t), dt):
+            raise ValueError('Times must be evenly spaced for fixed steps')
+    else:
+        dt = 0.
+    if out is None:
+        out = np.empty((len(t), 4))
+    elif out.shape != (len(t), 4):
+        raise ValueError('out must have shape (%d, 4)' % len(t))
+
+    try:
+        stepper = _methods[method]
+    except KeyError:
+        raise ValueError('Unknown method %r, expected one of %s' % (method,
+            ', '.join(sorted(_methods))))
+
+    out[0] = state
+    stepper(out, dt / substeps, substeps, g, l1, l2, m1, m2)
+    return out
+
+
+def energy(y, g=G, l1=L1, l2=L2, m1=M1, m2=M2):
+    'Total energy for states along the last axis of y.'
+    th1, w1, th2, w2 = y[..., 0], y[..., 1], y[..., 2], y[..., 3]
+    kinetic = (0.5*(m1+m2)*l1*l1*w1*w1 + 0.5*m2*l2*l2*w2*w2
+               + m2*l1*l2*w1*w2*np.cos(th1 - th2))
+    potential = -(m1+m2)*g*l1*np.cos(th1) - m2*g*l2*np.cos(th2)
+    return kinetic + potential
+
+
+def benchmark(dts=(0.05, 0.01, 0.002), steps=(1000, 10000, 100000),
+        check_time=5.0):
+    '''
+    Compare odeint with the fixed step methods. For every dt and number of
+    steps this reports the run time and the largest drift in energy over
+    the run. Since the pendulum is chaotic, the error against a very
+    accurate reference solution is only measured over the first
+    `check_time` seconds.
+    '''
+    state = np.array([120.0, 0.0, -10.0, 0.0])*np.pi/180.
+    e0 = energy(state)
+
+    t_ref = np.arange(0.0, check_time, 0.001)
+    ref = integrate.odeint(derivs, state, t_ref, rtol=1e-12, atol=1e-12)
+
+    runs = [('odeint', lambda s, t: integrate.odeint(derivs, s, t)),
+        ('rk4', lambda s, t: integrate_fixed(s, t, 'rk4')),
+        ('midpoint', lambda s, t: integrate_fixed(s, t, 'midpoint'))]
+
+    print('%-9s %7s %7s %10s %12s %12s' % ('method', 'dt', 'steps',
+        'time (s)', 'error', 'energy drift'))
+    for dt in dts:
+        for n in steps:
+            t = np.arange(n) * dt
+            for name, func in runs:
+                start = time.time()
+                y = func(state, t)
+                elapsed = time.time() - start
+
+                stride = int(round(dt / 0.001))
+                m = min(len(t), len(t_ref[::stride]))
+                error = np.abs(y[:m] - ref[::stride][:m]).max()
+                drift = np.abs(energy(y) - e0).max()
+                print('%-9s %7.3f %7d %10.3f %12.2e %12.2e' % (name, dt, n,
+                    elapsed, error, drift))
+
+
+if __name__ == '__main__':
+    benchmark()
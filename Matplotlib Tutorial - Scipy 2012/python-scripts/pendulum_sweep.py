@@ -0,0 +1,178 @@
+# Sweeping the double pendulum over a grid of initial conditions using all
+# of the cores on a machine.
+#
+# The trajectories go straight into a memory-mapped .npy file of shape
+# (N, T, 4). Each worker process opens that file itself and writes its chunk
+# in place, so the only thing sent back to the parent is the chunk number.
+# A small JSON checkpoint next to the output records which chunks are
+# finished, so rerunning the same sweep after a crash picks up where it
+# left off. integrate_batch() gives every pendulum its own steps, so the
+# results don't depend on how the states are split into chunks.
+
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+from numpy import pi
+
+from pendulum import integrate_batch, cartesian
+
+
+def angle_grid(th1, th2, w1=0.0, w2=0.0):
+    '''
+    Build an (N, 4) array of initial states from every combination of the
+    given initial angles (degrees). Angular velocities are in degrees per
+    second, like the demo.
+    '''
+    th1, th2 = np.meshgrid(th1, th2, indexing='ij')
+    states = np.empty((th1.size, 4))
+    states[:, 0] = th1.ravel()
+    states[:, 1] = w1
+    states[:, 2] = th2.ravel()
+    states[:, 3] = w2
+    return states * pi / 180.
+
+
+def checkpoint_path(path):
+    return path + '.ckpt.json'
+
+
+def positions_path(path):
+    return path + '.positions.npy'
+
+
+def _digest(states, t, kwargs):
+    # Identifies the sweep so that a checkpoint is never reused for a
+    # different set of inputs.
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(states, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(t, dtype=np.float64).tobytes())
+    h.update(json.dumps(kwargs, sort_keys=True).encode('ascii'))
+    return h.hexdigest()
+
+
+def _load_checkpoint(path, digest):
+    try:
+        with open(checkpoint_path(path)) as f:
+            ckpt = json.load(f)
+    except (IOError, ValueError):
+        return None
+    if ckpt.get('digest') != digest or not os.path.exists(path):
+        return None
+    return ckpt
+
+
+def _save_checkpoint(path, ckpt):
+    # Write then rename so a crash never leaves a half written checkpoint
+    tmp = checkpoint_path(path) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(ckpt, f)
+    os.replace(tmp, checkpoint_path(path))
+
+
+def _run_chunk(args):
+    # Runs in the worker process. Only the chunk number goes back.
+    path, index, start, states, t, kwargs = args
+    out = np.load(path, mmap_mode='r+')
+    out[start:start + len(states)] = integrate_batch(states, t, **kwargs)
+    out.flush()
+    del out
+    return index
+
+
+def sweep(states, t, path, chunk_size=256, processes=None, **kwargs):
+    '''
+    Integrate every initial state in `states` over times `t`, writing the
+    (N, T, 4) trajectories to the .npy file `path`.
+
+    Chunks of `chunk_size` states are farmed out to a pool of `processes`
+    workers (defaults to one per core). Any keyword arguments (rtol, atol)
+    are passed through to integrate_batch(). If a checkpoint for the same
+    sweep exists, only the chunks it does not list as done are run. Returns
+    the results as a read-only memory map.
+    '''
+    states = np.atleast_2d(np.asarray(states, dtype=np.float64))
+    t = np.asarray(t, dtype=np.float64)
+    n = states.shape[0]
+    nchunks = (n + chunk_size - 1) // chunk_size
+    digest = _digest(states, t, kwargs)
+
+    ckpt = _load_checkpoint(path, digest)
+    if ckpt is None or ckpt['chunk_size'] != chunk_size:
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64,
+            shape=(n, len(t), 4))
+        del out
+        ckpt = dict(digest=digest, chunk_size=chunk_size, nchunks=nchunks,
+            done=[])
+        _save_checkpoint(path, ckpt)
+
+    done = set(ckpt['done'])
+    todo = [(path, i, i * chunk_size, states[i * chunk_size:(i + 1) * chunk_size],
+        t, kwargs) for i in range(nchunks) if i not in done]
+
+    if todo:
+        pool = multiprocessing.Pool(processes)
+        try:
+            for index in pool.imap_unordered(_run_chunk, todo):
+                done.add(index)
+                ckpt['done'] = sorted(done)
+                _save_checkpoint(path, ckpt)
+        finally:
+            pool.close()
+            pool.join()
+
+    return np.load(path, mmap_mode='r')
+
+
+def sweep_positions(path, chunk_size=4096):
+    '''
+    Project a finished sweep onto bob positions, `chunk_size` trajectories
+    at a time, into the .npy file positions_path(path). Returns x1, y1, x2,
+    y2 as read-only (N, T) memory maps.
+    '''
+    y = np.load(path, mmap_mode='r')
+    fname = positions_path(path)
+    out = np.lib.format.open_memmap(fname, mode='w+', dtype=np.float64,
+        shape=(4,) + y.shape[:2])
+    for start in range(0, len(y), chunk_size):
+        stop = start + chunk_size
+        for i, col in enumerate(cartesian(y[start:stop])):
+            out[i, start:stop] = col
+    out.flush()
+    del out
+    return tuple(np.load(fname, mmap_mode='r'))
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    states = angle_grid(np.linspace(-180, 180, 40), np.linspace(-180, 180, 40))
+    t = np.arange(0.0, 20, 0.05)
+    path = os.path.join(tempfile.mkdtemp(), 'sweep.npy')
+
+    for procs in (1, None):
+        for f in (path, checkpoint_path(path)):
+            if os.path.exists(f):
+                os.remove(f)
+        start = time.time()
+        sweep(states, t, path, chunk_size=100, processes=procs)
+        print('%d trajectories, %s processes: %.2f s' % (len(states),
+            procs or multiprocessing.cpu_count(), time.time() - start))
+
+    # Running again finds every chunk in the checkpoint and returns at once
+    start = time.time()
+    y = sweep(states, t, path, chunk_size=100)
+    print('Resumed finished sweep: %.3f s' % (time.time() - start))
+    print('Result shape:', y.shape)
+
+    # Chunking doesn't change the answer
+    other = os.path.join(os.path.dirname(path), 'sweep8.npy')
+    print('Same trajectories with chunk_size=8: %s' % np.array_equal(y[:64],
+        sweep(states[:64], t, other, chunk_size=8)))
+
+    start = time.time()
+    x1, y1, x2, y2 = sweep_positions(path)
+    print('Positions %r: %.2f s' % (x1.shape, time.time() - start))
@@ -0,0 +1,91 @@
+# A buffer for accumulating (x, y) points for a Line2D that is being fed new
+# data a little at a time, such as the chaos game in Animations_tutorial.py.
+#
+# Appending to Python lists and calling set_data(x, y) means converting the
+# whole list to an array every frame. Instead, the points are stored in a
+# preallocated NumPy array and the x and y properties hand out views into
+# it, so nothing is copied to get at the data.
+
+import numpy as np
+
+
+class PointBuffer(object):
+    '''
+    Preallocated storage for a growing set of points.
+
+    With maxlen=None the buffer keeps everything, doubling its storage when
+    it fills up. Otherwise it is a ring buffer that keeps only the newest
+    maxlen points, so memory is fixed no matter how long it runs.
+
+    The ring is "mirrored": every point is written twice, maxlen apart, so
+    that the newest maxlen points always sit in one contiguous slice of the
+    storage and can be returned as a view without any wrapping.
+    '''
+    def __init__(self, maxlen=None, capacity=1024, dtype=np.float64):
+        self.maxlen = maxlen
+        if maxlen is None:
+            self._data = np.empty((2, capacity), dtype=dtype)
+        else:
+            self._data = np.empty((2, 2 * maxlen), dtype=dtype)
+        self._start = 0 # Start of the valid window
+        self._count = 0 # Number of valid points
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def x(self):
+        return self._data[0, self._start:self._start + self._count]
+
+    @property
+    def y(self):
+        return self._data[1, self._start:self._start + self._count]
+
+    def clear(self):
+        self._start = 0
+        self._count = 0
+
+    def append(self, x, y):
+        self.extend([x], [y])
+
+    def extend(self, x, y):
+        x = np.asarray(x)
+        y = np.asarray(y)
+        if self.maxlen is None:
+            self._extend_growing(x, y)
+        else:
+            self._extend_ring(x, y)
+
+    def _extend_growing(self, x, y):
+        n = x.size
+        end = self._count + n
+        if end > self._data.shape[1]:
+            # Double in size so that the copying is amortized over appends
+            cap = max(end, 2 * self._data.shape[1])
+            data = np.empty((2, cap), dtype=self._data.dtype)
+            data[:, :self._count] = self._data[:, :self._count]
+            self._data = data
+        self._data[0, self._count:end] = x
+        self._data[1, self._count:end] = y
+        self._count = end
+
+    def _extend_ring(self, x, y):
+        maxlen = self.maxlen
+        # Anything older than the last maxlen new points would be overwritten
+        if x.size > maxlen:
+            x = x[-maxlen:]
+            y = y[-maxlen:]
+        n = x.size
+
+        # The next slot to write is the one just past the newest point
+        pos = (self._start + self._count) % maxlen
+        idx = (pos + np.arange(n)) % maxlen
+        self._data[0, idx] = x
+        self._data[1, idx] = y
+        self._data[0, idx + maxlen] = x
+        self._data[1, idx + maxlen] = y
+
+        self._count += n
+        if self._count > maxlen:
+            self._start = (self._start + self._count - maxlen) % maxlen
+            self._count = maxlen
@@ -0,0 +1,203 @@
+# Movie writers for saving animations on machines without ffmpeg or
+# mencoder.
+#
+# Rather than handing frames to an external program, these take the raw
+# RGBA buffer from the Agg canvas and encode it straight into a file as each
+# frame arrives: no subprocess and no temporary PNG per frame. Two formats
+# are provided:
+#
+# * GifStream: an animated GIF. The palette is computed from the first
+#   frame and reused for the frames after it, which saves re-quantizing
+#   every frame from scratch (and stops colors flickering between frames).
+#   A frame with colors that the palette has nothing close to (ones that
+#   weren't in the first frame) gets a new palette of its own, stored with
+#   the frame, which is then reused in the same way.
+# * FrameArchive: a simple chunked file of zlib compressed RGBA frames,
+#   lossless and fast to write. read_frame_archive() reads it back.
+#
+# Both have the same open/write/close interface, so they can also be used
+# as the sink for parallel_save.save_parallel(). RawFrameWriter wraps either
+# one as a movie writer for Animation.save().
+
+import struct
+import zlib
+from io import BytesIO
+
+import numpy as np
+from matplotlib.animation import AbstractMovieWriter
+from PIL import Image, GifImagePlugin
+
+
+class GifStream(object):
+    '''
+    Write RGBA frames of the given (width, height) to an animated GIF.
+
+    A frame is given a new palette if any of its pixels would be more than
+    `tolerance` (out of 255, in any channel) away from its color using the
+    current one.
+    '''
+    def __init__(self, path, size, fps, loop=0, tolerance=24):
+        self.size = tuple(size)
+        self.duration = int(round(1000. / fps))
+        self.loop = loop
+        self.tolerance = tolerance
+        self.palettes = 0
+        self._palette = None
+        self._colors = None
+        self._file = open(path, 'wb')
+
+    def _new_palette(self, im):
+        self._palette = im.quantize(256, method=Image.Quantize.FASTOCTREE)
+        self._colors = np.array(self._palette.getpalette(),
+            dtype=np.int16).reshape(-1, 3)
+        self.palettes += 1
+        return self._palette
+
+    def write(self, buf):
+        im = Image.frombuffer('RGBA', self.size, buf, 'raw', 'RGBA', 0, 1)
+        im = im.convert('RGB')
+        if self._palette is None:
+            frame = self._new_palette(im)
+            header, _ = GifImagePlugin.getheader(frame,
+                info=dict(loop=self.loop, optimize=False))
+            for chunk in header:
+                self._file.write(chunk)
+        else:
+            frame = im.quantize(palette=self._palette,
+                dither=Image.Dither.NONE)
+            error = np.abs(self._colors[np.asarray(frame)] -
+                np.asarray(im, dtype=np.int16)).max()
+            if error > self.tolerance:
+                frame = self._new_palette(im)
+        # Frames using anything but the first palette carry their own
+        for chunk in GifImagePlugin.getdata(frame, duration=self.duration,
+                include_color_table=self.palettes > 1):
+            self._file.write(chunk)
+
+    def close(self):
+        self._file.write(b';') # GIF trailer
+        self._file.close()
+
+
+class FrameArchive(object):
+    '''
+    Write RGBA frames of the given (width, height) to a file of zlib
+    compressed frames.
+
+    The file starts with a header of the magic bytes, width, height and fps,
+    followed by each frame as a 4 byte length and the compressed data.
+    '''
+    magic = b'RGBAFRM1'
+    header = struct.Struct('<8sIIf')
+    length = struct.Struct('<I')
+
+    def __init__(self, path, size, fps, level=1):
+        self.size = tuple(size)
+        self.level = level
+        self._file = open(path, 'wb')
+        self._file.write(self.header.pack(self.magic, self.size[0],
+            self.size[1], fps))
+
+    def write(self, buf):
+        data = zlib.compress(buf, self.level)
+        self._file.write(self.length.pack(len(data)))
+        self._file.write(data)
+
+    def close(self):
+        self._file.close()
+
+
+def read_frame_archive(path):
+    '''
+    Read a file written by FrameArchive. Returns the fps and a generator of
+    (height, width, 4) uint8 arrays, one per frame.
+    '''
+    f = open(path, 'rb')
+    magic, width, height, fps = FrameArchive.header.unpack(
+        f.read(FrameArchive.header.size))
+    if magic != FrameArchive.magic:
+        f.close()
+        raise ValueError('%s is not a frame archive' % path)
+
+    def frames():
+        with f:
+            while True:
+                length = f.read(FrameArchive.length.size)
+                if not length:
+                    break
+                data = f.read(FrameArchive.length.unpack(length)[0])
+                yield np.frombuffer(zlib.decompress(data),
+                    dtype=np.uint8).reshape(height, width, 4)
+
+    return fps, frames()
+
+
+class RawFrameWriter(AbstractMovieWriter):
+    '''
+    Movie writer for Animation.save() that passes the canvas's RGBA buffer
+    to `encoder` (GifStream or FrameArchive) for every frame. Extra keyword
+    arguments are given to the encoder.
+
+        anim.save('images.gif', writer=RawFrameWriter(fps=15))
+    '''
+    def __init__(self, fps=5, encoder=GifStream, metadata=None, **kwargs):
+        super(RawFrameWriter, self).__init__(fps=fps, metadata=metadata)
+        self.encoder = encoder
+        self.encoder_kw = kwargs
+
+    def setup(self, fig, outfile, dpi=None):
+        super(RawFrameWriter, self).setup(fig, outfile, dpi=dpi)
+        self._stream = self.encoder(outfile, self.frame_size, self.fps,
+            **self.encoder_kw)
+
+    def grab_frame(self, **savefig_kwargs):
+        canvas = self.fig.canvas
+        if (not savefig_kwargs and self.dpi == self.fig.dpi
+                and hasattr(canvas, 'buffer_rgba')):
+            # Render and use Agg's buffer directly
+            canvas.draw()
+            self._stream.write(canvas.buffer_rgba())
+        else:
+            # Need savefig to handle the dpi or other options
+            buf = BytesIO()
+            savefig_kwargs.update(format='rgba', dpi=self.dpi)
+            self.fig.savefig(buf, **savefig_kwargs)
+            self._stream.write(buf.getbuffer())
+
+    def finish(self):
+        self._stream.close()
+
+
+if __name__ == '__main__':
+    import os
+    import tempfile
+    import time
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib import animation
+    from image_animation import ImageSequenceAnimation
+
+    nframes = 50
+    data = np.random.randn(nframes, 20, 20)
+    outdir = tempfile.mkdtemp()
+
+    writers = [('gif', RawFrameWriter(fps=15), 'images.gif'),
+        ('zlib archive', RawFrameWriter(fps=15, encoder=FrameArchive),
+            'images.frames'),
+        ('PillowWriter', animation.PillowWriter(fps=15), 'pillow.gif')]
+    if animation.writers.is_available('ffmpeg'):
+        writers.append(('ffmpeg pipe', animation.FFMpegWriter(fps=15),
+            'images.mp4'))
+    else:
+        print('ffmpeg not available, skipping the pipe-based writer')
+
+    for name, writer, fname in writers:
+        fig = plt.figure()
+        anim = ImageSequenceAnimation(fig, data, interval=500, repeat=False)
+        start = time.time()
+        anim.save(os.path.join(outdir, fname), writer=writer)
+        elapsed = time.time() - start
+        print('%-14s %6.1f frames/s' % (name, nframes / elapsed))
+        plt.close(fig)
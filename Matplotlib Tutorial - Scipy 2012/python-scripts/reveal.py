@@ -0,0 +1,231 @@
+# Lines that are revealed a bit more each frame, as in the update_line and
+# update_lines examples in Animations_tutorial.py.
+#
+# Calling line.set_data(t[:frame], x[:frame]) every frame makes the line
+# re-validate, convert and re-transform the entire prefix each time, so
+# drawing an n point line this way costs O(n**2) overall. RevealLine takes
+# the full data once and just moves a cursor for how many points are
+# visible. The path (and its transform, which is only redone when the
+# transform itself changes) are built once for all of the data and each
+# draw uses a view of the first `count` vertices. When blitting,
+# RevealAnimation goes one step further and draws only the newly revealed
+# segment on top of what is already on the canvas.
+
+import time
+
+import numpy as np
+from matplotlib.animation import TimedAnimation
+from matplotlib.lines import Line2D
+from matplotlib.path import Path
+
+
+class _PathWindow(object):
+    # Stands in for Line2D's TransformedPath, handing back a window of the
+    # cached full path instead of the whole thing.
+    def __init__(self, tpath, start, stop):
+        self._tpath = tpath
+        self._start = start
+        self._stop = stop
+
+    def _window(self, path, affine):
+        verts = path.vertices[self._start:self._stop]
+        return Path(verts, _interpolation_steps=path._interpolation_steps), affine
+
+    def get_transformed_path_and_affine(self):
+        return self._window(*self._tpath.get_transformed_path_and_affine())
+
+    def get_transformed_points_and_affine(self):
+        return self._window(*self._tpath.get_transformed_points_and_affine())
+
+    def get_fully_transformed_path(self):
+        path, affine = self.get_transformed_path_and_affine()
+        return affine.transform_path(path)
+
+
+class RevealLine(Line2D):
+    '''
+    A Line2D holding the full `xdata` and `ydata` of which only the first
+    `count` points are drawn.
+
+    Use set_count() or advance() to change how much is visible; set_data()
+    still works but resets the cached path. Limits and autoscaling use all
+    of the data, so the axes don't jump around as the line grows.
+    '''
+    def __init__(self, xdata, ydata, count=0, **kwargs):
+        self._count = count
+        self._drawn = 0 # Points on the canvas from the last draw
+        self._draw_from = None # Where an incremental draw starts
+        self._full_path = None
+        Line2D.__init__(self, xdata, ydata, **kwargs)
+
+    def __len__(self):
+        return len(self.get_xdata(orig=True))
+
+    def get_count(self):
+        return self._count
+
+    def set_count(self, count):
+        count = max(0, min(count, len(self)))
+        if count != self._count:
+            self._count = count
+            self.stale = True
+
+    def advance(self, n=1):
+        self.set_count(self._count + n)
+
+    def recache(self, always=False):
+        Line2D.recache(self, always)
+        # Windows of the path replace matplotlib's own subslicing
+        self._subslice = False
+        self._full_path = None
+
+    def _transform_path(self, subslice=None):
+        Line2D._transform_path(self, subslice)
+        self._full_path = self._transformed_path
+
+    def _vertex_count(self, npoints):
+        # Step drawstyles add extra vertices between the points
+        if npoints == 0 or self._drawstyle == 'default':
+            return npoints
+        elif self._drawstyle == 'steps-mid':
+            return 2 * npoints
+        else:
+            return 2 * npoints - 1
+
+    def _get_transformed_path(self):
+        if self._full_path is None:
+            self._transform_path()
+        start = 0
+        if self._draw_from:
+            # Back up one point so the new segment joins the old one
+            start = self._vertex_count(self._draw_from - 1)
+        return _PathWindow(self._full_path, start,
+            self._vertex_count(self._count))
+
+    def draw(self, renderer):
+        Line2D.draw(self, renderer)
+        self._drawn = self._count
+        self._draw_from = None
+
+    def draw_new(self, renderer):
+        '''
+        Draw only the points revealed since the last draw, on top of what is
+        already there.
+        '''
+        if self._count > self._drawn and self._drawn > 0:
+            self._draw_from = self._drawn
+        self.draw(renderer)
+
+
+class RevealAnimation(TimedAnimation):
+    '''
+    Reveal `lines` (RevealLines) `step` points per frame until all of them
+    are fully drawn.
+
+    With blit=True each frame only draws the newly revealed segments on top
+    of the previous frame, so the cost of a frame doesn't depend on how much
+    of the line is already showing. The other keyword arguments are the
+    same as for FuncAnimation (interval, repeat, repeat_delay...).
+    '''
+    def __init__(self, fig, lines, step=1, **kwargs):
+        self.lines = list(lines)
+        self.step = step
+        self._drawn_artists = self.lines
+        self._last = 0
+        npoints = max(len(line) for line in self.lines)
+        self._framedata = range(0, npoints + step, step)
+        self._save_count = len(self._framedata)
+        super(RevealAnimation, self).__init__(fig, **kwargs)
+
+    def _init_draw(self):
+        super(RevealAnimation, self)._init_draw()
+        for line in self.lines:
+            line.set_count(0)
+            line.set_animated(self._blit)
+        self._last = 0
+
+    def _pre_draw(self, framedata, blit):
+        # Only clear when starting over, otherwise build on the last frame
+        if framedata < self._last or not blit:
+            super(RevealAnimation, self)._pre_draw(framedata, blit)
+
+    def _draw_frame(self, framedata):
+        # Without blitting, or once the cache has been reset (e.g. after a
+        # resize), the whole line needs drawing again
+        restart = (framedata < self._last or not self._blit
+            or not self._blit_cache)
+        self._last = framedata
+        for line in self.lines:
+            line.set_count(framedata)
+            if restart:
+                line._drawn = 0
+        self._drawn_artists = self.lines
+
+    def _blit_draw(self, artists):
+        # Like Animation._blit_draw, but drawing just the new segments
+        updated_ax = set(a.axes for a in artists)
+        for ax in updated_ax:
+            cur_view = ax._get_view()
+            view, bg = self._blit_cache.get(ax, (object(), None))
+            if cur_view != view:
+                self._blit_cache[ax] = (
+                    cur_view, ax.figure.canvas.copy_from_bbox(ax.bbox))
+        renderer = self._fig.canvas.get_renderer()
+        for a in artists:
+            a.draw_new(renderer)
+        for ax in updated_ax:
+            ax.figure.canvas.blit(ax.bbox)
+
+
+def _time_set_data(fig, line, t, x):
+    # The update_line approach: a new prefix for set_data every frame
+    canvas = fig.canvas
+    line.set_animated(True)
+    canvas.draw()
+    bg = canvas.copy_from_bbox(line.axes.bbox)
+    start = time.time()
+    for frame in range(t.size + 1):
+        canvas.restore_region(bg)
+        line.set_data(t[:frame], x[:frame])
+        line.axes.draw_artist(line)
+        canvas.blit(line.axes.bbox)
+    return time.time() - start
+
+
+def _time_reveal(fig, line):
+    canvas = fig.canvas
+    line.set_animated(True)
+    canvas.draw()
+    start = time.time()
+    for frame in range(len(line) + 1):
+        line.set_count(frame)
+        line.draw_new(canvas.get_renderer())
+        canvas.blit(line.axes.bbox)
+    return time.time() - start
+
+
+if __name__ == '__main__':
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    print('%8s %14s %14s' % ('points', 'set_data (s)', 'RevealLine (s)'))
+    for n in (500, 2000, 8000):
+        t = np.linspace(0, 10, n)
+        x = np.exp(-0.5 * t) * np.sin(2 * np.pi * t)
+
+        fig = plt.figure()
+        ax = fig.add_subplot(1, 1, 1)
+        line, = ax.plot(t, x)
+        old = _time_set_data(fig, line, t, x)
+        plt.close(fig)
+
+        fig = plt.figure()
+        ax = fig.add_subplot(1, 1, 1)
+        line = RevealLine(t, x)
+        ax.add_line(line)
+        ax.autoscale_view()
+        new = _time_reveal(fig, line)
+        plt.close(fig)
+
+        print('%8d %14.3f %14.3f' % (n, old, new))
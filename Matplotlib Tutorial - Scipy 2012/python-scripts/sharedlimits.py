@@ -0,0 +1,140 @@
+# Autoscaling for big grids of shared axes.
+#
+# With plt.subplots(n, n, sharex=True, sharey=True), or the shareAx loop in
+# Axes_tutorial.py, plotting on a panel only marks it as needing its limits
+# worked out again. But every time anything then asks any panel for its view
+# limits (which a draw does many times per axes, for ticks, transforms and
+# so on), matplotlib checks each of the panels it shares with to see if one
+# of them needs autoscaling. For a share group of n panels that's n checks
+# per lookup and the cost of a draw grows like n**2.
+#
+# CoordinatedAxes keeps one "needs autoscaling" flag per share group
+# instead. Plotting on any member sets it; the first lookup after that
+# autoscales the group once, from the data limits of all of its members, and
+# clears it; every other lookup just checks the flag.
+#
+# All of the axes in a share group need to be CoordinatedAxes, which is
+# easiest done with coordinated_subplots() or by passing
+# axes_class=CoordinatedAxes to add_subplot().
+
+import time
+
+from matplotlib.axes import Axes
+
+
+class LimitGroup(object):
+    'The axes sharing one axis ("x" or "y"), with a single stale flag.'
+    def __init__(self, name, ax):
+        self.name = name
+        self.members = [ax]
+        self.stale = False
+
+    def __len__(self):
+        return len(self.members)
+
+    def merge(self, other):
+        'Move the members of `other` into this group.'
+        if other is self:
+            return
+        for ax in other.members:
+            ax._limit_groups[self.name] = self
+        self.members.extend(other.members)
+        self.stale = self.stale or other.stale
+
+
+class CoordinatedAxes(Axes):
+    '''
+    Axes that work out autoscaled limits once per share group, see above.
+    Used just like Axes.
+    '''
+    def __init__(self, *args, **kwargs):
+        # Sharing happens during Axes.__init__, so this has to come first
+        self._limit_groups = dict(x=LimitGroup('x', self),
+            y=LimitGroup('y', self))
+        Axes.__init__(self, *args, **kwargs)
+
+    def _join(self, name, other):
+        groups = getattr(other, '_limit_groups', None)
+        if groups is None or groups[name] is None:
+            # Sharing with ordinary axes, which only understand the
+            # per-axes flags; fall back to checking those
+            self._limit_groups[name] = None
+        elif self._limit_groups[name] is not None:
+            groups[name].merge(self._limit_groups[name])
+
+    def sharex(self, other):
+        Axes.sharex(self, other)
+        self._join('x', other)
+
+    def sharey(self, other):
+        Axes.sharey(self, other)
+        self._join('y', other)
+
+    def _request_autoscale_view(self, axis='all', tight=None):
+        Axes._request_autoscale_view(self, axis, tight)
+        for name, group in self._limit_groups.items():
+            if group is not None and axis in ('all', name):
+                group.stale = True
+
+    def _unstale_viewLim(self):
+        groups = self._limit_groups
+        if groups['x'] is None or groups['y'] is None:
+            Axes._unstale_viewLim(self)
+            return
+
+        need_scale = dict((name, group.stale)
+            for name, group in groups.items())
+        if any(need_scale.values()):
+            for name, group in groups.items():
+                if group.stale:
+                    group.stale = False
+                    for ax in group.members:
+                        ax._stale_viewlims[name] = False
+            self.autoscale_view(scalex=need_scale['x'],
+                scaley=need_scale['y'])
+
+
+def coordinated_subplots(fig, nrows=1, ncols=1, **kwargs):
+    '''
+    fig.subplots() with CoordinatedAxes. Keyword arguments (sharex, sharey,
+    subplot_kw...) are the same as for Figure.subplots().
+    '''
+    subplot_kw = dict(kwargs.pop('subplot_kw', None) or {})
+    subplot_kw['axes_class'] = CoordinatedAxes
+    return fig.subplots(nrows, ncols, subplot_kw=subplot_kw, **kwargs)
+
+
+if __name__ == '__main__':
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    x = np.linspace(0, 1, 50)
+    nlines = 5
+
+    def run(n, subplots):
+        fig = plt.figure(figsize=(n, n))
+        axes = subplots(fig, n, n, sharex=True, sharey=True)
+        start = time.time()
+        for k in range(nlines):
+            for ax in axes.flat:
+                ax.plot(1000 * x, 1000 * (k + 1) * x)
+        plot = time.time() - start
+        start = time.time()
+        fig.canvas.draw()
+        draw = time.time() - start
+        lims = axes[-1, -1].get_xlim(), axes[-1, -1].get_ylim()
+        plt.close(fig)
+        return plot, draw, lims
+
+    plain = lambda fig, n, m, **kwargs: fig.subplots(n, m, **kwargs)
+    print('%d lines per panel, times in ms per panel' % nlines)
+    print('%6s %20s %20s' % ('grid', 'plot + draw', 'coordinated'))
+    for n in (3, 6, 10, 14):
+        p_plot, p_draw, p_lims = run(n, plain)
+        c_plot, c_draw, c_lims = run(n, coordinated_subplots)
+        assert np.allclose(p_lims, c_lims)
+        print('%6s %9.2f + %7.2f %9.2f + %7.2f' % ('%dx%d' % (n, n),
+            1000 * p_plot / n**2, 1000 * p_draw / n**2,
+            1000 * c_plot / n**2, 1000 * c_draw / n**2))
@@ -0,0 +1,204 @@
+# tight_layout() for grids that are laid out over and over again.
+#
+# Every call to fig.tight_layout() asks every axes for its tight bounding
+# box, which means working out the ticks and measuring all of the tick
+# labels, titles and axis labels. (matplotlib already caches the size of
+# each string for a given font and renderer; it's everything around that
+# which adds up.) When a dashboard redraws the same grid with new data, very
+# little of that changes. CachedTightLayout remembers how far each axes'
+# labels stick out past its edges, along with a cheap signature of the
+# things that decide that: the size of the axes, the ticks and their label
+# strings, the tick settings, titles, axis labels, texts and legend. Working
+# out the ticks and formatting their labels is cheap next to measuring the
+# text, and it means that autoscaled axes whose limits move with the data
+# but whose tick labels stay the same still come from the cache. Only axes
+# whose signature has changed are measured again, then matplotlib's own
+# tight_layout arithmetic is run on the result.
+#
+# When the limits move but the labels don't, the first and last tick labels
+# move along their axis a little, so how far they poke out past the ends of
+# the axis is taken from the last measurement; that's at most half a label,
+# which the layout padding normally covers. Anything else that sticks out
+# of an axes and changes (an unclipped artist, say) isn't tracked; call
+# invalidate() after changing such things.
+
+import time
+import weakref
+
+from matplotlib.layout_engine import TightLayoutEngine
+from matplotlib.transforms import Bbox
+
+
+def _text_state(text):
+    return (text.get_text(), text.get_visible(),
+        hash(text.get_fontproperties()), text.get_rotation())
+
+
+def axes_signature(ax):
+    '''
+    A tuple that changes whenever the tight bounding box of `ax` might
+    change relative to the axes itself (barring the exceptions above).
+    '''
+    bbox = ax.bbox
+    sig = [ax.get_visible(), ax.axison, int(round(bbox.width)),
+        int(round(bbox.height)), ax.get_xscale(), ax.get_yscale()]
+    for axis in (ax.xaxis, ax.yaxis):
+        sig.extend([axis.get_visible(), axis.get_label_position(),
+            axis.get_ticks_position(), _text_state(axis.label),
+            repr(sorted(axis._major_tick_kw.items())),
+            repr(sorted(axis._minor_tick_kw.items()))])
+        # The ticks that will be drawn, and their labels, rather than the
+        # view limits, which change far more often
+        sig.append(tuple((tick.get_loc(), tick.label1.get_text(),
+            tick.label2.get_text()) for tick in axis._update_ticks()))
+        sig.append(axis.offsetText.get_text())
+    for loc in ('left', 'center', 'right'):
+        sig.append(ax.get_title(loc))
+    sig.append(_text_state(ax.title))
+    sig.append(tuple(_text_state(t) + (t.get_position(),) for t in ax.texts))
+    legend = ax.get_legend()
+    if legend is not None:
+        sig.append(tuple(_text_state(t) for t in legend.get_texts()))
+        sig.append(legend._loc)
+    return tuple(sig)
+
+
+class CachedTightLayout(TightLayoutEngine):
+    '''
+    A tight_layout engine that only measures the axes that have changed
+    since it last ran.
+
+    Use it with fig.set_layout_engine(layout) to lay out on every draw, or
+    call layout.execute(fig) instead of fig.tight_layout(). The arguments
+    are the same as for tight_layout().
+
+    The measurements for the last `per_axes` signatures of each axes are
+    kept, since autoscaled axes tend to go back and forth between a few
+    sets of tick labels.
+
+    `stats` counts the axes that were measured and those that were taken
+    from the cache, and the time spent; time_saved estimates how long the
+    cached axes would have taken to measure.
+    '''
+    def __init__(self, pad=1.08, h_pad=None, w_pad=None, rect=(0, 0, 1, 1),
+            per_axes=8):
+        TightLayoutEngine.__init__(self, pad=pad, h_pad=h_pad, w_pad=w_pad,
+            rect=rect)
+        self.per_axes = per_axes
+        self._margins = weakref.WeakKeyDictionary()
+        self.stats = dict(calls=0, measured=0, cached=0, measure_time=0.0,
+            layout_time=0.0)
+
+    def invalidate(self, ax=None):
+        'Forget the measurements for `ax`, or for all axes.'
+        if ax is None:
+            self._margins.clear()
+        else:
+            self._margins.pop(ax, None)
+
+    @property
+    def time_saved(self):
+        'Estimated time saved by not measuring cached axes, in seconds.'
+        if not self.stats['measured']:
+            return 0.0
+        per_axes = self.stats['measure_time'] / self.stats['measured']
+        return per_axes * self.stats['cached']
+
+    def _tightbbox(self, ax, renderer):
+        sig = axes_signature(ax)
+        window = ax.get_window_extent(renderer)
+        known = self._margins.setdefault(ax, {})
+        if sig in known:
+            self.stats['cached'] += 1
+            left, bottom, right, top = known[sig]
+        else:
+            start = time.time()
+            tight = ax.get_tightbbox(renderer, for_layout_only=True)
+            self.stats['measure_time'] += time.time() - start
+            self.stats['measured'] += 1
+            if tight is None:
+                return None
+            left = window.x0 - tight.x0
+            bottom = window.y0 - tight.y0
+            right = tight.x1 - window.x1
+            top = tight.y1 - window.y1
+            if len(known) >= self.per_axes:
+                # Forget the oldest
+                del known[next(iter(known))]
+            known[sig] = (left, bottom, right, top)
+        return Bbox.from_extents(window.x0 - left, window.y0 - bottom,
+            window.x1 + right, window.y1 + top)
+
+    def execute(self, fig):
+        start = time.time()
+        renderer = fig._get_renderer()
+        patched = []
+        try:
+            # Hand tight_layout the (possibly cached) boxes in place of
+            # measuring each axes itself
+            for ax in fig.axes:
+                bbox = self._tightbbox(ax, renderer)
+                ax.get_tightbbox = (lambda *args, _bbox=bbox, **kwargs:
+                    _bbox)
+                patched.append(ax)
+            TightLayoutEngine.execute(self, fig)
+        finally:
+            for ax in patched:
+                del ax.get_tightbbox
+        self.stats['calls'] += 1
+        self.stats['layout_time'] += time.time() - start
+
+
+if __name__ == '__main__':
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    x = np.linspace(0, 1, 1000)
+    repeat = 50
+
+    def make_grid(autoscale):
+        fig, axes = plt.subplots(3, 3)
+        lines = []
+        for i, ax in enumerate(axes.flat):
+            lines.extend(ax.plot(1000 * x, 1000 * np.random.randn(1000)))
+            if not autoscale:
+                ax.set_ylim(-4000, 4000)
+            ax.locator_params(nbins=4)
+            ax.ticklabel_format(scilimits=(-1, 1))
+            ax.set_title('Panel %d' % i)
+        return fig, lines
+
+    def run(layout, autoscale):
+        fig, lines = make_grid(autoscale)
+        rng = np.random.RandomState(0)
+        start = time.time()
+        for i in range(repeat):
+            for line in lines:
+                line.set_ydata(1000 * rng.randn(1000))
+                if autoscale:
+                    line.axes.relim()
+                    line.axes.autoscale_view()
+            layout(fig)
+        elapsed = (time.time() - start) / repeat
+        params = fig.subplotpars
+        plt.close(fig)
+        return elapsed, (params.left, params.bottom, params.right,
+            params.top, params.wspace, params.hspace)
+
+    for autoscale in (False, True):
+        print('fixed limits' if not autoscale else 'autoscaled limits')
+        plain, plain_params = run(lambda fig: fig.tight_layout(), autoscale)
+        engine = CachedTightLayout()
+        cached, cached_params = run(engine.execute, autoscale)
+        print('  tight_layout():     %.2f ms per layout' % (1000 * plain))
+        print('  CachedTightLayout:  %.2f ms per layout' % (1000 * cached))
+        print('    %(measured)d axes measured, %(cached)d from the cache' %
+            engine.stats)
+        print('    estimated time saved: %.3f s over %d layouts' % (
+            engine.time_saved, repeat))
+        # Axes sizes are compared to the nearest pixel, so allow for
+        # sub-pixel differences
+        print('    same layout: %s' % np.allclose(plain_params,
+            cached_params, atol=1e-4))
@@ -0,0 +1,351 @@
+# Showing images far bigger than the screen, such as one gigapixel array per
+# panel of an ImageGrid.
+#
+# imshow() resamples the whole array on every draw, even when zoomed in on a
+# corner, and zoomed out it reads every pixel to produce a few hundred
+# thousand. TiledImage keeps a pyramid of the image instead: the data
+# itself, then copies at 1/2, 1/4, 1/8... the size, each pixel the average
+# of four in the level below. The levels are built once, as needed, and can
+# be kept in memory-mapped temporary files (cache_dir) so that they don't
+# have to fit in memory any more than the data, which can itself be a
+# memmap. Each draw picks the level whose pixels are closest to (but not
+# bigger than) the screen pixels at the current zoom and DPI, and resamples
+# only the visible part of it, read from the level in square tiles which are
+# cached for the next draw when panning.
+#
+# TiledImage is an AxesImage, so colorbars (ImageGrid's
+# cbar_axes[i].colorbar(im) included), set_clim() and set_cmap() work as
+# usual. Its norm is scaled from the smallest and largest values of the
+# full resolution data, which are found while building the first halved
+# level, so that the colours and colorbars match imshow()'s; the averaged
+# levels would give a narrower range.
+
+import collections
+import math
+import tempfile
+import time
+
+import numpy as np
+from matplotlib import rcParams
+from matplotlib.image import AxesImage
+from matplotlib.transforms import Bbox, TransformedBbox
+
+
+class ImagePyramid(object):
+    '''
+    Levels of an (M, N) or (M, N, 3|4) image `data`, each half the size of
+    the last, built when first needed and read in `tile` x `tile` pieces of
+    which the last `max_tiles` are kept. If `cache_dir` is given, levels
+    are stored in temporary memory-mapped files there.
+    '''
+    def __init__(self, data, tile=512, cache_dir=None, max_tiles=64):
+        if data.ndim not in (2, 3):
+            raise ValueError('Image data must be 2D or 3D, got shape %r' %
+                (data.shape,))
+        self.levels = [data]
+        self.tile = tile
+        self.cache_dir = cache_dir
+        self.max_tiles = max_tiles
+        self._tiles = collections.OrderedDict()
+        self._range = None
+
+        # Levels down to the first one that fits in a single tile
+        self.nlevels = 1
+        size = max(data.shape[:2])
+        while size > tile:
+            size = (size + 1) // 2
+            self.nlevels += 1
+
+    @property
+    def shape(self):
+        return self.levels[0].shape
+
+    def level(self, k):
+        'The image at 1/2**k of its size.'
+        while len(self.levels) <= k:
+            self.levels.append(self._halve(self.levels[-1]))
+        return self.levels[k]
+
+    def overview(self):
+        'The coarsest level, which fits in one tile.'
+        return self.level(self.nlevels - 1)
+
+    def data_range(self):
+        'The smallest and largest finite values in the full resolution data.'
+        if self._range is None:
+            if self.nlevels > 1:
+                # Found along the way
+                self.level(1)
+            else:
+                self._update_range(np.asarray(self.levels[0]))
+        return self._range
+
+    def _update_range(self, values):
+        if values.dtype.kind == 'f':
+            # NaN and inf are masked out by imshow(), so leave them out too
+            values = np.where(np.isfinite(values), values, np.nan)
+        lo, hi = np.fmin.reduce(values, axis=None), np.fmax.reduce(values,
+            axis=None)
+        if self._range is not None:
+            lo, hi = np.fmin(lo, self._range[0]), np.fmax(hi, self._range[1])
+        self._range = np.array([lo, hi])
+
+    def _empty(self, shape, dtype):
+        if self.cache_dir is None:
+            return np.empty(shape, dtype=dtype)
+        # Unnamed file, removed again when the memmap is closed
+        f = tempfile.TemporaryFile(dir=self.cache_dir)
+        return np.memmap(f, dtype=dtype, mode='w+', shape=shape)
+
+    def _halve(self, src, band=512):
+        rows, cols = src.shape[:2]
+        if src.ndim == 2:
+            dtype = np.result_type(src.dtype, np.float32)
+        else:
+            dtype = src.dtype
+        out = self._empty(((rows + 1) // 2, (cols + 1) // 2) + src.shape[2:],
+            dtype)
+        # A band of rows at a time, so that memory use doesn't depend on the
+        # size of the image. Odd edges are padded by repeating the last
+        # row/column.
+        for r in range(0, rows, band):
+            block = np.asarray(src[r:r + band])
+            if src is self.levels[0]:
+                self._update_range(block)
+            block = np.asarray(block, dtype=np.float32)
+            if block.shape[0] % 2:
+                block = np.concatenate([block, block[-1:]], axis=0)
+            if block.shape[1] % 2:
+                block = np.concatenate([block, block[:, -1:]], axis=1)
+            mean = 0.25 * (block[0::2, 0::2] + block[1::2, 0::2] +
+                block[0::2, 1::2] + block[1::2, 1::2])
+            if np.issubdtype(dtype, np.integer):
+                mean = np.rint(mean)
+            out[r // 2:r // 2 + len(mean)] = mean
+        return out
+
+    def _tile(self, k, i, j):
+        key = (k, i, j)
+        try:
+            self._tiles[key] = tile = self._tiles.pop(key)
+        except KeyError:
+            t = self.tile
+            tile = np.array(self.level(k)[i * t:(i + 1) * t,
+                j * t:(j + 1) * t])
+            self._tiles[key] = tile
+            if len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def window(self, k, r0, r1, c0, c1):
+        'Rows r0:r1 and columns c0:c1 of level k, put together from tiles.'
+        level = self.level(k)
+        t = self.tile
+        out = np.empty((r1 - r0, c1 - c0) + level.shape[2:],
+            dtype=level.dtype)
+        for i in range(r0 // t, (r1 - 1) // t + 1):
+            for j in range(c0 // t, (c1 - 1) // t + 1):
+                tile = self._tile(k, i, j)
+                tr0 = max(r0 - i * t, 0)
+                tr1 = min(r1 - i * t, tile.shape[0])
+                tc0 = max(c0 - j * t, 0)
+                tc1 = min(c1 - j * t, tile.shape[1])
+                out[i * t + tr0 - r0:i * t + tr1 - r0,
+                    j * t + tc0 - c0:j * t + tc1 - c0] = tile[tr0:tr1, tc0:tc1]
+        return out
+
+
+class TiledImage(AxesImage):
+    '''
+    An AxesImage drawing `data` (an array, memmap or ImagePyramid) from a
+    multi-resolution pyramid, see above. `tile` and `cache_dir` are passed
+    on to ImagePyramid; other arguments are as for AxesImage. Usually
+    created with tiled_imshow().
+    '''
+    def __init__(self, ax, data, tile=512, cache_dir=None, **kwargs):
+        AxesImage.__init__(self, ax, **kwargs)
+        if isinstance(data, ImagePyramid):
+            self.pyramid = data
+        else:
+            self.pyramid = ImagePyramid(data, tile, cache_dir)
+        # The overview stands in for the data wherever matplotlib looks at
+        # the whole array, except for scaling the norm (see below)
+        AxesImage.set_data(self, self.pyramid.overview())
+        self.last_level = None
+
+    def autoscale(self):
+        self.norm.autoscale(self.pyramid.data_range())
+
+    def autoscale_None(self):
+        self.norm.autoscale_None(self.pyramid.data_range())
+
+    def get_size(self):
+        return self.pyramid.shape[:2]
+
+    def _row_to_y(self, row):
+        nrows = self.pyramid.shape[0]
+        left, right, bottom, top = self.get_extent()
+        if self.origin == 'upper':
+            return top + row * (bottom - top) / float(nrows)
+        return bottom + row * (top - bottom) / float(nrows)
+
+    def _y_to_row(self, y):
+        nrows = self.pyramid.shape[0]
+        left, right, bottom, top = self.get_extent()
+        if self.origin == 'upper':
+            return (y - top) / (bottom - top) * nrows
+        return (y - bottom) / (top - bottom) * nrows
+
+    def _col_to_x(self, col):
+        left, right, bottom, top = self.get_extent()
+        return left + col * (right - left) / float(self.pyramid.shape[1])
+
+    def _visible_window(self):
+        # Visible rows and columns of the full image, as fractional indices
+        ncols = self.pyramid.shape[1]
+        left, right, bottom, top = self.get_extent()
+        (vx0, vy0), (vx1, vy1) = self.axes.viewLim.get_points()
+        cols = sorted((vx - left) / (right - left) * ncols for vx in (vx0, vx1))
+        rows = sorted(self._y_to_row(vy) for vy in (vy0, vy1))
+        return rows, cols
+
+    def make_image(self, renderer, magnification=1.0, unsampled=False):
+        nrows, ncols = self.pyramid.shape[:2]
+        (r_lo, r_hi), (c_lo, c_hi) = self._visible_window()
+        r0 = max(int(math.floor(r_lo)) - 1, 0)
+        r1 = min(int(math.ceil(r_hi)) + 1, nrows)
+        c0 = max(int(math.floor(c_lo)) - 1, 0)
+        c1 = min(int(math.ceil(c_hi)) + 1, ncols)
+        if r0 >= r1 or c0 >= c1:
+            return None, 0, 0, None
+
+        # How many image pixels end up in each screen pixel
+        trans = self.get_transform()
+        corners = trans.transform([[self._col_to_x(c0), self._row_to_y(r0)],
+            [self._col_to_x(c1), self._row_to_y(r1)]])
+        width, height = np.abs(corners[1] - corners[0]) * magnification
+        ratio = max((c1 - c0) / max(width, 1.), (r1 - r0) / max(height, 1.))
+        k = 0
+        if ratio >= 2:
+            k = min(int(math.floor(math.log(ratio, 2))), self.pyramid.nlevels - 1)
+        self.last_level = k
+
+        # The same window at that level, and where it is in data coordinates
+        f = 2 ** k
+        lr0, lr1 = r0 // f, -(-r1 // f)
+        lc0, lc1 = c0 // f, -(-c1 // f)
+        # Masked etc. as set_data() would have
+        A = self._normalize_image_array(self.pyramid.window(k, lr0, lr1,
+            lc0, lc1))
+        x0 = self._col_to_x(lc0 * f)
+        x1 = self._col_to_x(min(lc1 * f, ncols))
+        ya = self._row_to_y(lr0 * f)
+        yb = self._row_to_y(min(lr1 * f, nrows))
+        if self.origin == 'upper':
+            bbox = Bbox([[x0, yb], [x1, ya]])
+        else:
+            bbox = Bbox([[x0, ya], [x1, yb]])
+        clip = ((self.get_clip_box() or self.axes.bbox) if self.get_clip_on()
+            else self.get_figure(root=True).bbox)
+        return self._make_image(A, bbox, TransformedBbox(bbox, trans), clip,
+            magnification, unsampled=unsampled)
+
+    def get_cursor_data(self, event):
+        # Look up the full resolution value rather than the overview
+        if event.xdata is None or event.ydata is None:
+            return None
+        nrows, ncols = self.pyramid.shape[:2]
+        left, right, bottom, top = self.get_extent()
+        col = int(math.floor((event.xdata - left) / (right - left) * ncols))
+        row = int(math.floor(self._y_to_row(event.ydata)))
+        if 0 <= row < nrows and 0 <= col < ncols:
+            return self.pyramid.levels[0][row, col]
+        return None
+
+
+def tiled_imshow(ax, data, cmap=None, norm=None, aspect=None,
+        interpolation=None, alpha=None, vmin=None, vmax=None, origin=None,
+        extent=None, tile=512, cache_dir=None, **kwargs):
+    '''
+    Like ax.imshow(data, ...), but creating a TiledImage. `tile` and
+    `cache_dir` are passed on to ImagePyramid.
+    '''
+    im = TiledImage(ax, data, tile=tile, cache_dir=cache_dir, cmap=cmap,
+        norm=norm, interpolation=interpolation, origin=origin, extent=extent,
+        **kwargs)
+    if aspect is None:
+        aspect = rcParams['image.aspect']
+    ax.set_aspect(aspect)
+    im.set_alpha(alpha)
+    if im.get_clip_path() is None:
+        im.set_clip_path(ax.patch)
+    if vmin is not None or vmax is not None:
+        im.set_clim(vmin, vmax)
+    im.autoscale_None()
+    im.set_extent(im.get_extent())
+    ax.add_image(im)
+    return im
+
+
+if __name__ == '__main__':
+    import os
+    import shutil
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.axes_grid1 import ImageGrid
+
+    size = 8000
+    tmp = tempfile.mkdtemp()
+    print('4 panels of %dx%d float32 memmaps' % (size, size))
+    arrays = []
+    y = np.linspace(-3, 3, size, dtype=np.float32)[:, np.newaxis]
+    for i in range(4):
+        data = np.lib.format.open_memmap(os.path.join(tmp, '%d.npy' % i),
+            'w+', np.float32, (size, size))
+        for r in range(0, size, 1000):
+            x = np.linspace(-3, 3, size, dtype=np.float32)
+            data[r:r + 1000] = np.sin((i + 1) * x * y[r:r + 1000]) * np.exp(
+                -x**2 / 4)
+        data.flush()
+        arrays.append(np.load(os.path.join(tmp, '%d.npy' % i), mmap_mode='r'))
+
+    def make_grid(show):
+        fig = plt.figure(figsize=(8, 8))
+        grid = ImageGrid(fig, 111, nrows_ncols=(2, 2), axes_pad=0.3,
+            cbar_mode='each', cbar_size='5%', cbar_pad=0.05)
+        for i, data in enumerate(arrays):
+            im = show(grid[i], data)
+            grid.cbar_axes[i].colorbar(im)
+        return fig, grid
+
+    def pan_time(fig, grid, steps=5):
+        # Zoom in to 1/8 of each panel, then pan across
+        times = []
+        for step in range(steps):
+            x0 = size * (0.2 + 0.05 * step)
+            for ax in grid:
+                ax.set_xlim(x0, x0 + size / 8.)
+                ax.set_ylim(size / 2. + size / 8., size / 2.)
+            start = time.time()
+            fig.canvas.draw()
+            times.append(time.time() - start)
+        return np.mean(times)
+
+    for name, show in [('imshow', lambda ax, data: ax.imshow(data)),
+            ('tiled', lambda ax, data: tiled_imshow(ax, data,
+                cache_dir=tmp))]:
+        start = time.time()
+        fig, grid = make_grid(show)
+        setup = time.time() - start
+        start = time.time()
+        fig.canvas.draw()
+        full = time.time() - start
+        pan = pan_time(fig, grid)
+        print('%-7s setup %6.2f s, full view %6.2f s, panning %6.3f s per '
+            'frame' % (name, setup, full, pan))
+        plt.close(fig)
+
+    del arrays
+    shutil.rmtree(tmp)
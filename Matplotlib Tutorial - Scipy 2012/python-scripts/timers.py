@@ -0,0 +1,311 @@
+# Helpers for timer driven animations, like the examples in the Timers
+# section of Animations_tutorial.py.
+
+import time
+from collections import deque
+
+import numpy as np
+from matplotlib.transforms import Bbox
+
+
+class AutoBlitTimer(object):
+    '''
+    Call `func(*args)` every `interval` milliseconds, redrawing only what it
+    changed.
+
+    The callback just modifies artists (set_data(), set_title(), etc.); there
+    is no need to return them or to write an init function. After each call
+    the artists on the figure's axes that are now stale are found. The first
+    time an artist changes it is made animated, and the figure is redrawn
+    once to capture a background without it. From then on each tick restores
+    that background, redraws the animated artists and blits just the regions
+    covered by the ones that changed. A full redraw only happens again when
+    something new changes, an axes' view limits move or the figure is
+    redrawn for some other reason (e.g. a resize).
+
+    On canvases that do not support blitting, this falls back to redrawing
+    the whole figure each tick.
+    '''
+    def __init__(self, fig, func, interval=100, args=()):
+        self.figure = fig
+        self.canvas = fig.canvas
+        self.func = func
+        self.args = args
+        self.full_draws = 0
+        self.blits = 0
+
+        self._animated = []
+        self._extents = {}
+        self._limits = {}
+        self._background = None
+
+        self._timer = self.canvas.new_timer(interval=interval)
+        self._timer.add_callback(self._on_timer)
+        self._timer.interval = interval # Work around bug in QT timer
+
+        self._cids = [self.canvas.mpl_connect('draw_event', self._on_draw),
+            self.canvas.mpl_connect('close_event', lambda *a: self.stop())]
+
+    def start(self):
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    def disconnect(self):
+        'Stop the timer and put the artists back to normal drawing.'
+        self.stop()
+        for cid in self._cids:
+            self.canvas.mpl_disconnect(cid)
+        for artist in self._animated:
+            artist.set_animated(False)
+        self._animated = []
+        self._background = None
+
+    def _watched(self):
+        # Everything on the axes that a callback is likely to modify
+        for ax in self.figure.axes:
+            for artist in ax.lines:
+                yield artist
+            for artist in ax.collections:
+                yield artist
+            for artist in ax.images:
+                yield artist
+            for artist in ax.patches:
+                yield artist
+            for artist in ax.texts:
+                yield artist
+            yield ax.title
+        for artist in self.figure.texts:
+            yield artist
+
+    def _limits_changed(self):
+        changed = False
+        for ax in self.figure.axes:
+            lims = tuple(ax.viewLim.bounds)
+            if self._limits.get(ax) != lims:
+                self._limits[ax] = lims
+                changed = True
+        return changed
+
+    def _extent(self, artist, renderer):
+        # Clipped artists (lines, images...) can only touch their clip box,
+        # which is also much cheaper than measuring them.
+        clip = artist.get_clip_box()
+        if artist.get_clip_on() and clip is not None:
+            bbox = clip.frozen()
+        else:
+            bbox = artist.get_window_extent(renderer).frozen()
+        # Leave a little room for antialiasing
+        return bbox.padded(2)
+
+    def _on_draw(self, event):
+        # A full draw happened, which skips the animated artists. Grab the
+        # background and draw them on top.
+        if not self._animated:
+            return
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        renderer = self.canvas.get_renderer()
+        for artist in self._animated:
+            self.figure.draw_artist(artist)
+            self._extents[artist] = self._extent(artist, renderer)
+
+    def _on_timer(self):
+        self.func(*self.args)
+
+        dirty = [a for a in self._watched() if a.stale]
+        if not dirty:
+            return
+
+        if not self.canvas.supports_blit:
+            self.full_draws += 1
+            self.canvas.draw_idle()
+            return
+
+        new = [a for a in dirty if not a.get_animated()]
+        for artist in new:
+            artist.set_animated(True)
+            self._animated.append(artist)
+
+        limits_changed = self._limits_changed()
+        if new or limits_changed or self._background is None:
+            self.full_draws += 1
+            self.canvas.draw()
+            return
+
+        self.blits += 1
+        self.canvas.restore_region(self._background)
+        renderer = self.canvas.get_renderer()
+        for artist in self._animated:
+            self.figure.draw_artist(artist)
+
+        # Blit where each changed artist was and where it is now
+        for artist in dirty:
+            extent = self._extent(artist, renderer)
+            old = self._extents.get(artist, extent)
+            self._extents[artist] = extent
+            region = Bbox.union([old, extent])
+            self.canvas.blit(Bbox.intersection(region, self.figure.bbox)
+                or self.figure.bbox)
+
+
+class TimerStats(object):
+    '''
+    Statistics on how well a timer callback is keeping up, over the last
+    `window` calls. Times are in milliseconds, like the timer interval.
+
+    Ideally the callback runs once per slot of one interval. The number of
+    slots between two calls is the time between them rounded to a whole
+    number of intervals, so ticks up to half an interval early or late (as
+    timers often are) count as on time.
+
+    * ticks: timer events received
+    * calls: times the callback actually ran
+    * dropped: slots that passed without a callback of their own, because
+      the event loop was busy or ticks were skipped
+    * skipped: ticks deliberately not run because of an earlier overrun
+    * coalesced: ticks that arrived less than half an interval after the
+      last call, for a slot that was already handled
+    * overruns: calls that took longer than the interval
+    '''
+    def __init__(self, interval, window=100):
+        self.interval = interval
+        self.ticks = 0
+        self.calls = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.coalesced = 0
+        self.overruns = 0
+        self._durations = deque(maxlen=window)
+        self._starts = deque(maxlen=window)
+
+    @property
+    def mean_duration(self):
+        return float(np.mean(self._durations)) if self._durations else 0.
+
+    @property
+    def max_duration(self):
+        return max(self._durations) if self._durations else 0.
+
+    @property
+    def load(self):
+        'Fraction of the interval used by the callback on average.'
+        return self.mean_duration / self.interval
+
+    @property
+    def fps(self):
+        'Callbacks per second actually achieved.'
+        if len(self._starts) < 2:
+            return 0.
+        return 1000. * (len(self._starts) - 1) / (self._starts[-1]
+            - self._starts[0])
+
+    @property
+    def target_fps(self):
+        return 1000. / self.interval
+
+    @property
+    def jitter(self):
+        'Standard deviation of the time between callbacks.'
+        if len(self._starts) < 3:
+            return 0.
+        return float(np.std(np.diff(self._starts)))
+
+    def keeping_up(self, tolerance=0.9):
+        '''
+        Whether the callback is managing at least `tolerance` of the target
+        frame rate.
+        '''
+        return self.fps >= tolerance * self.target_fps
+
+    def record(self, start, duration):
+        self.calls += 1
+        self._starts.append(start)
+        self._durations.append(duration)
+        if duration > self.interval:
+            self.overruns += 1
+
+    def as_dict(self):
+        return dict(ticks=self.ticks, calls=self.calls, dropped=self.dropped,
+            skipped=self.skipped, coalesced=self.coalesced,
+            overruns=self.overruns, fps=self.fps, target_fps=self.target_fps,
+            jitter=self.jitter, mean_duration=self.mean_duration,
+            max_duration=self.max_duration, load=self.load)
+
+    def __repr__(self):
+        return ('TimerStats(fps=%.1f/%.1f, mean=%.1fms, max=%.1fms, '
+            'jitter=%.1fms, dropped=%d)' % (self.fps, self.target_fps,
+            self.mean_duration, self.max_duration, self.jitter, self.dropped))
+
+
+class GovernedTimer(object):
+    '''
+    A canvas timer calling `func(*args)` every `interval` milliseconds that
+    measures how long each call takes and how regularly it runs. The numbers
+    are available from the `stats` attribute (a TimerStats).
+
+    With adaptive=True, when a call overruns the interval, any ticks for the
+    slots it overlapped are skipped rather than run back to back to catch
+    up. With coalesce=True, the callback is called as `func(nframes, *args)`,
+    where nframes is how many slots have passed since it last ran (1 when
+    keeping up), so it can advance the animation by that many frames at
+    once and keep to real time.
+    '''
+    def __init__(self, fig, func, interval=100, args=(), adaptive=True,
+            coalesce=False, window=100):
+        self.func = func
+        self.args = args
+        self.interval = interval
+        self.adaptive = adaptive
+        self.coalesce = coalesce
+        self.stats = TimerStats(interval, window)
+
+        self._last = None
+        self._skip_until = None
+
+        self._timer = fig.canvas.new_timer(interval=interval)
+        self._timer.add_callback(self._on_timer)
+        self._timer.interval = interval # Work around bug in QT timer
+        fig.canvas.mpl_connect('close_event', lambda *a: self.stop())
+
+    def start(self):
+        self._last = None
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    def _on_timer(self):
+        now = 1000. * time.perf_counter()
+        stats = self.stats
+        stats.ticks += 1
+        if self._last is None:
+            # The first tick comes one interval after starting
+            self._last = now - self.interval
+            self._skip_until = None
+
+        # Slots since the last call, counted from when it actually ran so
+        # that early and late ticks don't accumulate into a lost frame
+        nframes = int((now - self._last) / self.interval + 0.5)
+        if nframes < 1:
+            stats.coalesced += 1
+            return
+        if self._skip_until is not None and now < self._skip_until:
+            stats.skipped += 1
+            return
+
+        stats.dropped += nframes - 1
+        self._last = now
+        self._skip_until = None
+
+        if self.coalesce:
+            self.func(nframes, *self.args)
+        else:
+            self.func(*self.args)
+
+        end = 1000. * time.perf_counter()
+        stats.record(now, end - now)
+        if self.adaptive and end - now > self.interval:
+            # Leave the ticks that piled up meanwhile and wait for the next
+            # slot after the overrun
+            self._skip_until = end + 0.5 * self.interval
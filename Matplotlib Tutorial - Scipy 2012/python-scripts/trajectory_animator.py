@@ -0,0 +1,155 @@
+# Animating one trajectory on several panels at once, each showing a
+# different pair of its coordinates, like the x/y/z exercise at the end of
+# Animations_tutorial.py.
+#
+# Each panel gets a trail (a RevealLine, see reveal.py) and a marker for the
+# current point. When blitting, all of the panels share a single background
+# covering the whole figure, which already includes the trails drawn so far.
+# A frame restores it once, draws only the newly revealed piece of each
+# trail, saves the result as the new background and then draws the markers
+# on top. The cost of a frame grows with the number of panels only through
+# the handful of artists that change, not the length of the trails.
+
+import time
+
+import numpy as np
+from matplotlib.animation import TimedAnimation
+from matplotlib.lines import Line2D
+
+from reveal import RevealLine
+
+
+class TrajectoryAnimator(TimedAnimation):
+    '''
+    Animate the (T, D) array `data` on one panel per entry of `pairs`, each
+    a pair of column indices giving the x and y of that panel.
+
+    If `axes` isn't given, one row of subplots is created on `fig`, labelled
+    using `names` (one per column) and scaled to fit the data. `trail_kw`
+    and `marker_kw` are passed to the trail and marker lines. Each frame
+    advances `step` points. Other keyword arguments go to TimedAnimation
+    (interval, repeat, blit...).
+    '''
+    def __init__(self, fig, data, pairs, axes=None, names=None, trail_kw=None,
+            marker_kw=None, step=1, **kwargs):
+        self.data = np.asarray(data)
+        self.pairs = list(pairs)
+        self.step = step
+
+        if axes is None:
+            axes = [fig.add_subplot(1, len(self.pairs), i + 1)
+                for i in range(len(self.pairs))]
+            for ax, (i, j) in zip(axes, self.pairs):
+                self._setup_axes(ax, i, j, names)
+        self.axes = list(axes)
+
+        trail_kw = dict(dict(color='b', linewidth=1), **(trail_kw or {}))
+        marker_kw = dict(dict(color='r', marker='o', markersize=8,
+            linestyle='none'), **(marker_kw or {}))
+        self.trails = []
+        self.markers = []
+        for ax, (i, j) in zip(self.axes, self.pairs):
+            trail = RevealLine(self.data[:, i], self.data[:, j], **trail_kw)
+            marker = Line2D([], [], **marker_kw)
+            ax.add_line(trail)
+            ax.add_line(marker)
+            self.trails.append(trail)
+            self.markers.append(marker)
+
+        self._background = None
+        self._framedata = range(0, len(self.data), step)
+        self._save_count = len(self._framedata)
+        self._drawn_artists = []
+        super(TrajectoryAnimator, self).__init__(fig, **kwargs)
+        self._draw_id = fig.canvas.mpl_connect('draw_event',
+            self._on_full_draw)
+
+    def _setup_axes(self, ax, i, j, names):
+        for col, set_lim in ((i, ax.set_xlim), (j, ax.set_ylim)):
+            lo = self.data[:, col].min()
+            hi = self.data[:, col].max()
+            pad = 0.05 * (hi - lo) or 0.5
+            set_lim(lo - pad, hi + pad)
+        if names is not None:
+            ax.set_xlabel(names[i])
+            ax.set_ylabel(names[j])
+
+    def _on_full_draw(self, event):
+        # A full draw leaves out the animated artists, so the trails have to
+        # be drawn again from scratch on a new background
+        self._background = None
+
+    def _init_draw(self):
+        super(TrajectoryAnimator, self)._init_draw()
+        for trail, marker in zip(self.trails, self.markers):
+            trail.set_count(0)
+            marker.set_data([], [])
+            trail.set_animated(self._blit)
+            marker.set_animated(self._blit)
+        self._background = None
+
+    def _pre_draw(self, framedata, blit):
+        # Restoring the background is handled in _blit_draw
+        pass
+
+    def _draw_frame(self, framedata):
+        if framedata == 0:
+            # Starting over
+            self._background = None
+        for trail, marker, (i, j) in zip(self.trails, self.markers,
+                self.pairs):
+            trail.set_count(framedata + 1)
+            marker.set_data([self.data[framedata, i]],
+                [self.data[framedata, j]])
+        self._drawn_artists = self.trails + self.markers
+
+    def _blit_draw(self, artists):
+        canvas = self._fig.canvas
+        if self._background is None:
+            canvas.draw()
+            self._background = canvas.copy_from_bbox(self._fig.bbox)
+            for trail in self.trails:
+                trail._drawn = 0
+        else:
+            canvas.restore_region(self._background)
+
+        renderer = canvas.get_renderer()
+        for trail in self.trails:
+            trail.draw_new(renderer)
+        self._background = canvas.copy_from_bbox(self._fig.bbox)
+
+        for marker in self.markers:
+            marker.draw(renderer)
+        for ax in self.axes:
+            canvas.blit(ax.bbox)
+
+    def _stop(self, *args):
+        self._fig.canvas.mpl_disconnect(self._draw_id)
+        super(TrajectoryAnimator, self)._stop(*args)
+
+
+if __name__ == '__main__':
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    # The data from the exercise, but longer
+    t = np.linspace(0, 80, 4000)
+    data = np.column_stack([np.cos(2 * np.pi * t / 10.),
+        np.sin(2 * np.pi * t / 10.), 10 * t])
+    pairs = [(0, 2), (1, 2), (0, 1)]
+
+    print('%7s %16s' % ('panels', 'ms per frame'))
+    for npanels in (1, 3, 6, 9):
+        fig = plt.figure(figsize=(3 * npanels, 3))
+        anim = TrajectoryAnimator(fig, data, (pairs * 3)[:npanels],
+            names='xyz', blit=True)
+        fig.canvas.draw()
+        anim._init_draw()
+        frames = list(anim.new_frame_seq())
+        start = time.time()
+        for framedata in frames:
+            anim._draw_next_frame(framedata, blit=True)
+        elapsed = time.time() - start
+        print('%7d %16.2f' % (npanels, 1000 * elapsed / len(frames)))
+        plt.close(fig)